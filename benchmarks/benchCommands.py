@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+"""Benchmark the onboard.py commands against the local fake controller.
+
+For every inventory size a fake controller is started in a subprocess and
+each command is run in-process, cold (a fresh Api, so authentication is
+included), reporting:
+
+    requests     requests received by the controller
+    wall         wall time of the command in seconds
+    p50 / p99    client side request latency in milliseconds
+    peak MiB     peak Python heap of the command (measured in a second,
+                 traced run so tracing does not skew the timings)
+
+    python benchmarks/benchCommands.py --sizes 100,1000,10000 --latency 0.005
+    python benchmarks/benchCommands.py --sizes 1000 --json results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    from urllib.request import urlopen, Request
+except ImportError:
+    from urllib2 import urlopen, Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("DNAC_IP", "127.0.0.1")
+os.environ.setdefault("DNAC_USERNAME", "admin")
+os.environ.setdefault("DNAC_PASSWORD", "admin")
+os.environ["DNAC_TOKEN_CACHE"] = "off"
+
+import tabulate
+from click.testing import CliRunner
+
+import fakeController
+import onboard
+from dnacsdk.api import Api
+
+TARGET = fakeController.Fixtures.device(1)["hostname"]
+
+COMMANDS = {
+    "device_list": ["device_list"],
+    "device_list_ndjson": ["device_list", "--format", "ndjson"],
+    "template_list": ["template_list"],
+    "interface_list": ["interface_list", TARGET],
+    "deploy": ["deploy", "--template", "NetworkDeviceOnboarding", "--target", TARGET,
+               "INTERFACE=GigabitEthernet1/0/1", "VLAN=1001", "INTERFACE_DESCRIPTION=bench"],
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def controller_call(port, path, method = "GET"):
+    request = Request("http://127.0.0.1:{}{}".format(port, path),
+                      data = b"" if method == "POST" else None)
+    return json.loads(urlopen(request).read().decode("utf-8"))
+
+
+def start_controller(size, args):
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target = fakeController.serve, kwargs = {
+        "devices": size,
+        "interfaces": args.interfaces,
+        "templates": args.templates,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "ready": ready,
+    })
+    process.daemon = True
+    process.start()
+    return process, ready.get(timeout = 120)
+
+
+def run_command(port, argv, traced = False):
+    """Run one command with a fresh Api, returning wall time, client side
+    request latencies, and the peak traced memory if traced.
+    """
+    dnacp = Api(ip = "127.0.0.1:{}".format(port), username = "admin", password = "admin",
+                scheme = "http")
+    latencies = []
+    dnacp.add_hook(lambda event: event["kind"] == "request" and latencies.append(event["duration"]))
+    onboard.dnacp = dnacp
+
+    # click 7+ names commands device-list, click 6 device_list
+    if argv[0] not in onboard.cli.commands:
+        argv = [argv[0].replace("_", "-")] + argv[1:]
+
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = CliRunner().invoke(onboard.cli, argv)
+    wall = time.perf_counter() - start
+    peak = None
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    dnacp.close()
+
+    if result.exit_code != 0:
+        raise RuntimeError("{} failed: {}\n{}".format(" ".join(argv), result.exception, result.output))
+    return wall, latencies, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark onboard.py against a fake controller")
+    parser.add_argument("--sizes", default = "100,1000,10000", help = "comma separated device counts")
+    parser.add_argument("--commands", default = ",".join(sorted(COMMANDS)))
+    parser.add_argument("--interfaces", type = int, default = 48)
+    parser.add_argument("--templates", type = int, default = 20)
+    parser.add_argument("--latency", type = float, default = 0.002, help = "seconds added per request")
+    parser.add_argument("--jitter", type = float, default = 0.0)
+    parser.add_argument("--repeat", type = int, default = 3, help = "timed runs per command, best is kept")
+    parser.add_argument("--json", help = "also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        process, port = start_controller(size, args)
+        try:
+            for name in args.commands.split(","):
+                argv = COMMANDS[name]
+                best = None
+                for _ in range(args.repeat):
+                    controller_call(port, "/_fake/reset", "POST")
+                    wall, latencies, _ = run_command(port, argv)
+                    requests = sum(controller_call(port, "/_fake/stats").values())
+                    if best is None or wall < best[0]:
+                        best = (wall, latencies, requests)
+                _, _, peak = run_command(port, argv, traced = True)
+
+                wall, latencies, requests = best
+                results.append({
+                    "devices": size,
+                    "command": name,
+                    "requests": requests,
+                    "wall_s": round(wall, 4),
+                    "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                    "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+                    "peak_mib": round(peak / 1048576.0, 2),
+                })
+                print(json.dumps(results[-1]), file = sys.stderr)
+        finally:
+            process.terminate()
+            process.join()
+
+    headers = ["devices", "command", "requests", "wall_s", "p50_ms", "p99_ms", "peak_mib"]
+    print(tabulate.tabulate([[result[key] for key in headers] for result in results], headers))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+"""Benchmark the memory held by NetworkDevice objects.
+
+Device records shaped like the controller's are decoded from JSON, as a
+page would be, turned into devices, and the records dropped. The memory
+still held afterwards (Python heap, traced with tracemalloc) is reported
+per device, for each retention setting:
+
+    records      the decoded records alone, for reference
+    full         RETAIN = True, the whole record kept (the default)
+    retain=N     only the attributes plus N named fields
+    compact      only the attributes, retain = ()
+
+    python benchmarks/benchMemory.py --sizes 10000,50000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tabulate
+
+import fakeController
+from dnacsdk.networkDevice import NetworkDevice
+
+CASES = [
+    ("records", None),
+    ("full", True),
+    ("retain=2", ("softwareVersion", "role")),
+    ("compact", ()),
+]
+
+
+def held_bytes(payload, retain):
+    """Bytes still allocated once the devices are built and the records dropped
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(payload)
+    if retain is None:
+        held = records
+    else:
+        held = [NetworkDevice.from_info(None, record, retain) for record in records]
+    del records
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark NetworkDevice memory")
+    parser.add_argument("--sizes", default = "10000,50000", help = "comma separated device counts")
+    parser.add_argument("--json", help = "also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        payload = json.dumps([fakeController.Fixtures.device(index) for index in range(size)])
+        for name, retain in CASES:
+            held = held_bytes(payload, retain)
+            results.append({
+                "devices": size,
+                "case": name,
+                "total_mib": round(held / 1048576.0, 2),
+                "bytes_per_device": int(held / size),
+            })
+            print(json.dumps(results[-1]), file = sys.stderr)
+
+    headers = ["devices", "case", "total_mib", "bytes_per_device"]
+    print(tabulate.tabulate([[result[key] for key in headers] for result in results], headers))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#! /usr/bin/env python
+"""Benchmark the cold start of onboard.py.
+
+Each case is run as a fresh interpreter, as a job runner would spawn it,
+reporting the best and median wall time, and which of the heavy
+dependencies were imported by the time the command returned. The
+forwarded cases run a command through `onboard.py serve`, started against
+a fake controller.
+
+    python benchmarks/benchStartup.py
+    python benchmarks/benchStartup.py --runs 50 --json startup.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tabulate
+
+import onboard
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakeController
+
+HEAVY_MODULES = ["requests", "urllib3", "tabulate", "jwt", "sqlite3", "aiohttp"]
+
+CASES = {
+    "python": [],
+    "help": ["--help"],
+    "deploy --help": ["deploy", "--help"],
+    "template_list --help": ["template_list", "--help"],
+}
+
+# Run while `onboard.py serve` is running
+FORWARDED_CASES = {
+    "template_list, forwarded": ["template_list"],
+    "device_list, forwarded": ["device_list"],
+}
+
+# Runs onboard.py in-process, then reports the heavy modules it imported
+PROBE = """
+import sys, json
+sys.argv = ["onboard.py"] + {argv!r}
+sys.path.insert(0, {root!r})
+try:
+    if len(sys.argv) > 1:
+        import onboard
+        # As onboard.py's __main__ does
+        if onboard.forward_to_daemon(sys.argv[1:]) is None:
+            onboard.cli(prog_name="onboard.py")
+except SystemExit:
+    pass
+finally:
+    sys.stdout = sys.__stdout__
+    print(json.dumps([name for name in {modules!r} if name in sys.modules]), file=sys.stderr)
+"""
+
+
+def run_case(argv, env):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", PROBE.format(argv = argv, root = ROOT,
+                                                                 modules = HEAVY_MODULES)],
+                             env = env, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE,
+                             universal_newlines = True, check = True)
+    wall = time.perf_counter() - start
+    return wall, json.loads(process.stderr.strip().splitlines()[-1])
+
+
+def run_cases(cases, env, runs):
+    results = []
+    for name, argv in cases.items():
+        # click 7+ names commands template-list, click 6 template_list
+        if argv and not argv[0].startswith("-") and argv[0] not in onboard.cli.commands:
+            argv = [argv[0].replace("_", "-")] + argv[1:]
+
+        walls = []
+        imported = []
+        for _ in range(runs):
+            wall, imported = run_case(argv, env)
+            walls.append(wall)
+        results.append({
+            "case": name,
+            "best_ms": round(min(walls) * 1000, 1),
+            "median_ms": round(statistics.median(walls) * 1000, 1),
+            "heavy_imports": ",".join(imported) or "-",
+        })
+        print(json.dumps(results[-1]), file = sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark onboard.py cold start")
+    parser.add_argument("--runs", type = int, default = 20, help = "interpreter starts per case")
+    parser.add_argument("--json", help = "also write the results to this file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DNAC_IP = "127.0.0.1", DNAC_USERNAME = "admin", DNAC_PASSWORD = "admin",
+               DNAC_DAEMON = "on", DNACSDK_SOCKET = os.path.join(directory, "onboard.sock"),
+               DNACSDK_TOKEN_DIR = directory, DNACSDK_INDEX_DIR = directory)
+    results = []
+    try:
+        results += run_cases(CASES, env, args.runs)
+
+        ready = multiprocessing.Queue()
+        controller = multiprocessing.Process(target = fakeController.serve,
+                                             kwargs = {"port": 0, "devices": 100, "ready": ready})
+        controller.start()
+        env.update(DNAC_IP = "127.0.0.1:{}".format(ready.get(timeout = 120)), DNAC_SCHEME = "http")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "onboard.py"), "serve"], env = env,
+                                  stdout = subprocess.DEVNULL)
+        try:
+            while not os.path.exists(env["DNACSDK_SOCKET"]):
+                if server.poll() is not None:
+                    sys.exit("onboard.py serve exited with {}".format(server.returncode))
+                time.sleep(0.05)
+            results += run_cases(FORWARDED_CASES, env, args.runs)
+        finally:
+            server.terminate()
+            server.wait()
+            controller.terminate()
+    finally:
+        shutil.rmtree(directory, ignore_errors = True)
+
+    headers = ["case", "best_ms", "median_ms", "heavy_imports"]
+    print(tabulate.tabulate([[result[key] for key in headers] for result in results], headers))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
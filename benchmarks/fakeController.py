@@ -0,0 +1,403 @@
+#! /usr/bin/env python
+"""Local DNA Center stand-in serving generated fixtures over plain HTTP.
+
+Serves the endpoints used by dnacsdk: auth token, network-device (with
+filters and offset/limit paging), interfaces, and template-programmer
+templates, versions, deploy and deploy status. Fixtures are generated
+deterministically, interfaces on demand, so large inventories cost little
+memory. Every response can be delayed to simulate a remote controller.
+
+    python benchmarks/fakeController.py --devices 1000 --latency 0.005 --port 18080
+
+    export DNAC_IP=127.0.0.1:18080 DNAC_SCHEME=http
+    export DNAC_USERNAME=admin DNAC_PASSWORD=admin
+    ./onboard.py device_list
+
+GET /_fake/stats returns request counts per endpoint, POST /_fake/reset
+clears them. POST /_fake/revoke rejects every token issued so far with a
+401, as an expired token would be. POST /_fake/throttle with
+{"requests": 2, "retry_after": "1"} answers the next 2 requests with a 429
+carrying that Retry-After header.
+"""
+
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+
+PAGE_LIMIT = 500
+FAMILIES = ("Switches and Hubs", "Routers", "Wireless Controller")
+ONBOARDING_PARAMS = ("INTERFACE", "VLAN", "INTERFACE_DESCRIPTION")
+
+
+def fake_jwt(lifetime):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+    claims = {"sub": "admin", "iat": time.time(), "exp": int(time.time() + lifetime)}
+    return "{}.{}.{}".format(encode({"alg": "none", "typ": "JWT"}), encode(claims), "fake")
+
+
+class Fixtures(object):
+    """Generated inventory of `devices` devices with `interfaces` ports each,
+    and `templates` templates (the first is NetworkDeviceOnboarding).
+    Devices are numbered from `first_device`, so controllers started with
+    different ranges manage different devices.
+    """
+
+    def __init__(self, devices = 100, interfaces = 48, templates = 20, first_device = 0):
+        self.interface_count = interfaces
+        self.devices = [self.device(index) for index in range(first_device, first_device + devices)]
+        self.by_id = dict((device["id"], device) for device in self.devices)
+        self.by_ip = dict((device["managementIpAddress"], device) for device in self.devices)
+        self.by_serial = dict((device["serialNumber"], device) for device in self.devices)
+        self.templates = [self.template(index) for index in range(templates)]
+        self.templates_by_id = dict((template["id"], template) for template in self.templates)
+
+    @staticmethod
+    def device(index):
+        family = FAMILIES[index % len(FAMILIES)]
+        return {
+            "id": "dev-{:08d}".format(index),
+            "hostname": "sw{:05d}.lab.local".format(index),
+            "managementIpAddress": "10.{}.{}.{}".format(index // 65536 % 256, index // 256 % 256, index % 256),
+            "serialNumber": "FOC{:08d}".format(index),
+            "macAddress": "00:11:{:02x}:{:02x}:{:02x}:00".format(index // 65536 % 256, index // 256 % 256, index % 256),
+            "location": None,
+            "locationName": None,
+            "family": family,
+            "type": "Cisco Catalyst 9300 Switch",
+            "series": "Cisco Catalyst 9300 Series Switches",
+            "platformId": "C9300-48P",
+            "softwareType": "IOS-XE",
+            "softwareVersion": "16.9.1",
+            "role": "ACCESS",
+            "roleSource": "AUTO",
+            "upTime": "10 days, 2:03:04.00",
+            "bootDateTime": "2018-07-01 10:00:00",
+            "lastUpdated": "2018-07-11 12:03:04",
+            "lastUpdateTime": 1531310584000,
+            "reachabilityStatus": "Reachable",
+            "reachabilityFailureReason": "",
+            "collectionStatus": "Managed",
+            "collectionInterval": "Global Default",
+            "errorCode": None,
+            "errorDescription": None,
+            "interfaceCount": "0",
+            "lineCardCount": "0",
+            "lineCardId": "",
+            "memorySize": "NA",
+            "tagCount": "0",
+            "tunnelUdpPort": None,
+            "snmpContact": "",
+            "snmpLocation": "",
+            "instanceUuid": "dev-{:08d}".format(index),
+            "instanceTenantId": "tenant-0001",
+            "apManagerInterfaceIp": "",
+            "associatedWlcIp": "",
+            "inventoryStatusDetail": "<status><general code=\"SUCCESS\"/></status>",
+        }
+
+    def interfaces(self, device):
+        ports = []
+        for port in range(self.interface_count):
+            ports.append({
+                "id": "{}-if-{:03d}".format(device["id"], port),
+                "deviceId": device["id"],
+                "portName": "GigabitEthernet1/0/{}".format(port + 1),
+                "adminStatus": "UP",
+                "status": "up" if port % 3 else "down",
+                "description": "" if port % 4 else "Camera {}".format(port),
+                "vlanId": str(1000 + port % 10),
+                "voiceVlan": None,
+                "portMode": "access",
+                "portType": "Ethernet Port",
+                "interfaceType": "Physical",
+                "macAddress": "00:aa:00:00:{:02x}:{:02x}".format(port // 256, port % 256),
+                "speed": "1000000",
+                "duplex": "FullDuplex",
+                "mtu": "1500",
+                "ifIndex": str(port + 1),
+                "className": "SwitchPort",
+                "ipv4Address": None,
+                "ipv4Mask": None,
+                "lastUpdated": None,
+                "series": device["series"],
+                "pid": device["platformId"],
+                "serialNo": device["serialNumber"],
+                "instanceUuid": "{}-if-{:03d}".format(device["id"], port),
+            })
+        return ports
+
+    @staticmethod
+    def template(index):
+        name = "NetworkDeviceOnboarding" if index == 0 else "Template{:03d}".format(index)
+        params = ONBOARDING_PARAMS if index == 0 else ("PARAM_A", "PARAM_B")
+        return {
+            "id": "tpl-{:04d}".format(index),
+            "name": name,
+            "projectName": "Onboarding",
+            "templateContent": "\n".join("! ${}".format(param) for param in params),
+            "templateParams": [{"parameterName": param, "dataType": "STRING"} for param in params],
+            "deviceTypes": [{"productFamily": "Switches and Hubs"}],
+            "versionsInfo": [{"id": "tpl-{:04d}-v{}".format(index, version)} for version in range(3)],
+        }
+
+
+class FakeController(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fixtures, latency = 0.0, jitter = 0.0, status_polls = 2,
+                 token_lifetime = 3600):
+        HTTPServer.__init__(self, address, Handler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.status_polls = status_polls
+        self.token_lifetime = token_lifetime
+        # Tokens issued before this time are rejected, see /_fake/revoke
+        self.revoked_before = 0
+        # Requests still to be answered 429, see /_fake/throttle
+        self.throttled = 0
+        self.retry_after = None
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.deployments = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.stats[endpoint] = self.stats.get(endpoint, 0) + 1
+
+    def throttle(self):
+        """True if this request is to be answered 429
+        """
+        with self.lock:
+            if self.throttled <= 0:
+                return False
+            self.throttled -= 1
+            return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment, avoiding delayed ACK stalls on keep-alive
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    ROUTES = (
+        ("POST", r"^/api/system/v1/auth/token$", "auth"),
+        ("GET", r"^/api/v1/network-device$", "device_list"),
+        ("GET", r"^/api/v1/network-device/serial-number/(?P<serial>[^/]+)$", "device_by_serial"),
+        ("GET", r"^/api/v1/network-device/ip-address/(?P<ip>[^/]+)$", "device_by_ip"),
+        ("GET", r"^/api/v1/network-device/(?P<id>[^/]+)$", "device_by_id"),
+        ("GET", r"^/api/v1/interface/network-device/(?P<id>[^/]+)(/(?P<start>\d+)/(?P<count>\d+))?$", "interfaces"),
+        ("GET", r"^/api/v1/template-programmer/template$", "template_list"),
+        ("GET", r"^/api/v1/template-programmer/template/version/(?P<id>[^/]+)$", "template_versions"),
+        ("GET", r"^/api/v1/template-programmer/template/deploy/status/(?P<id>[^/]+)$", "deploy_status"),
+        ("GET", r"^/api/v1/template-programmer/template/(?P<id>[^/]+)$", "template"),
+        ("POST", r"^/api/v1/template-programmer/template/deploy$", "deploy"),
+        ("GET", r"^/_fake/stats$", "fake_stats"),
+        ("POST", r"^/_fake/reset$", "fake_reset"),
+        ("POST", r"^/_fake/revoke$", "fake_revoke"),
+        ("POST", r"^/_fake/throttle$", "fake_throttle"),
+    )
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+        self.query = parse_qs(url.query)
+
+        for route_method, pattern, name in self.ROUTES:
+            match = re.match(pattern, url.path)
+            if route_method == method and match:
+                if not name.startswith("fake_"):
+                    self.server.count(name)
+                    if self.server.latency or self.server.jitter:
+                        time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+                    if self.server.throttle():
+                        headers = {"Retry-After": self.server.retry_after} if self.server.retry_after else {}
+                        return self.reply(429, {"message": "Too many requests"}, headers)
+                    if name != "auth" and not self.token_valid(self.headers.get("X-Auth-Token")):
+                        return self.reply(401, {"message": "Missing or expired X-Auth-Token"})
+                return getattr(self, name)(**match.groupdict())
+        self.reply(404, {"message": "No route for {} {}".format(method, url.path)})
+
+    def token_valid(self, token):
+        try:
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except (AttributeError, IndexError, ValueError):
+            return False
+        return claims.get("exp", 0) > time.time() and claims.get("iat", 0) >= self.server.revoked_before
+
+    def reply(self, status, data, headers = None):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def auth(self):
+        self.reply(200, {"Token": fake_jwt(self.server.token_lifetime)})
+
+    def device_list(self):
+        devices = self.server.fixtures.devices
+        for field, values in self.query.items():
+            if field in ("offset", "limit"):
+                continue
+            wanted = set(values)
+            devices = [device for device in devices if str(device.get(field)) in wanted]
+        offset = int(self.query.get("offset", ["1"])[0])
+        limit = min(int(self.query.get("limit", [str(PAGE_LIMIT)])[0]), PAGE_LIMIT)
+        self.reply(200, {"response": devices[offset - 1:offset - 1 + limit], "version": "1.0"})
+
+    def reply_device(self, device):
+        if device is None:
+            return self.reply(404, {"response": {"errorCode": "NOT_FOUND"}})
+        self.reply(200, {"response": device, "version": "1.0"})
+
+    def device_by_id(self, id):
+        self.reply_device(self.server.fixtures.by_id.get(id))
+
+    def device_by_ip(self, ip):
+        self.reply_device(self.server.fixtures.by_ip.get(ip))
+
+    def device_by_serial(self, serial):
+        self.reply_device(self.server.fixtures.by_serial.get(serial))
+
+    def interfaces(self, id, start = None, count = None):
+        device = self.server.fixtures.by_id.get(id)
+        if device is None:
+            return self.reply(404, {"response": {"errorCode": "NOT_FOUND"}})
+        interfaces = self.server.fixtures.interfaces(device)
+        if start is not None:
+            interfaces = interfaces[int(start) - 1:int(start) - 1 + min(int(count), PAGE_LIMIT)]
+        self.reply(200, {"response": interfaces, "version": "1.0"})
+
+    def template_list(self):
+        self.reply(200, [{
+            "name": template["name"],
+            "projectName": template["projectName"],
+            "templateId": template["id"],
+            "versionsInfo": template["versionsInfo"],
+        } for template in self.server.fixtures.templates])
+
+    def template(self, id):
+        template = self.server.fixtures.templates_by_id.get(id)
+        if template is None:
+            return self.reply(404, {"message": "Template not found"})
+        self.reply(200, dict((key, value) for key, value in template.items() if key != "versionsInfo"))
+
+    def template_versions(self, id):
+        template = self.server.fixtures.templates_by_id.get(id)
+        if template is None:
+            return self.reply(404, {"message": "Template not found"})
+        self.reply(200, [{"templateId": id, "versionsInfo": template["versionsInfo"]}])
+
+    def deploy(self):
+        body = json.loads(self.body.decode("utf-8") or "{}")
+        targets = [target["id"] for target in body.get("targetInfo", [])]
+        # Unique across fake controllers, as the UUIDs of real ones are
+        deploymentId = "deploy-{}-{:08d}".format(self.server.server_address[1], len(self.server.deployments))
+        with self.server.lock:
+            self.server.deployments[deploymentId] = {"targets": targets, "polls": 0}
+        self.reply(200, {"deploymentId": deploymentId, "startTime": "", "status": "INIT"})
+
+    def deploy_status(self, id):
+        with self.server.lock:
+            deployment = self.server.deployments.get(id)
+            if deployment is not None:
+                deployment["polls"] += 1
+        if deployment is None:
+            return self.reply(404, {"message": "Deployment not found"})
+        status = "SUCCESS" if deployment["polls"] > self.server.status_polls else "IN_PROGRESS"
+        self.reply(200, {
+            "deploymentId": id,
+            "status": status,
+            "devices": [{"deviceId": target, "status": status} for target in deployment["targets"]],
+        })
+
+    def fake_stats(self):
+        with self.server.lock:
+            self.reply(200, dict(self.server.stats))
+
+    def fake_reset(self):
+        with self.server.lock:
+            self.server.stats.clear()
+        self.reply(200, {})
+
+    def fake_revoke(self):
+        self.server.revoked_before = time.time()
+        self.reply(200, {})
+
+    def fake_throttle(self):
+        body = json.loads(self.body.decode("utf-8") or "{}")
+        with self.server.lock:
+            self.server.throttled = int(body.get("requests", 1))
+            self.server.retry_after = body.get("retry_after")
+        self.reply(200, {})
+
+
+def serve(port = 0, devices = 100, interfaces = 48, templates = 20, latency = 0.0,
+          jitter = 0.0, status_polls = 2, ready = None, first_device = 0):
+    """Run a fake controller until interrupted. If given, `ready` (e.g. a
+    multiprocessing Queue) receives the bound port once listening.
+    """
+    server = FakeController(("127.0.0.1", port), Fixtures(devices, interfaces, templates, first_device),
+                            latency = latency, jitter = jitter, status_polls = status_polls)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Local DNA Center stand-in")
+    parser.add_argument("--port", type = int, default = 18080)
+    parser.add_argument("--devices", type = int, default = 100)
+    parser.add_argument("--interfaces", type = int, default = 48, help = "ports per device")
+    parser.add_argument("--templates", type = int, default = 20)
+    parser.add_argument("--latency", type = float, default = 0.0, help = "seconds added to every response")
+    parser.add_argument("--jitter", type = float, default = 0.0, help = "random extra latency, up to this many seconds")
+    parser.add_argument("--status-polls", type = int, default = 2,
+                        help = "status polls answered IN_PROGRESS before SUCCESS")
+    parser.add_argument("--first-device", type = int, default = 0,
+                        help = "number of the first device, e.g. 1000 for a second region")
+    args = parser.parse_args()
+
+    print("Serving {} devices on http://127.0.0.1:{}".format(args.devices, args.port))
+    serve(args.port, args.devices, args.interfaces, args.templates, args.latency,
+          args.jitter, args.status_polls, first_device = args.first_device)
+
+
+if __name__ == "__main__":
+    main()
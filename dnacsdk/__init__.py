@@ -1,7 +1,19 @@
-import os.path
 import sys
+import types
 
-sys.path.append(os.path.dirname(__file__))
+from .exceptions import ResourceNotFound, UnauthorizedAccess, MissingConfig, DeviceNotFound
 
-from .api import Api #, set_config, configure
-from .exceptions import ResourceNotFound, UnauthorizedAccess, MissingConfig
+
+class __Package__(types.ModuleType):
+    """dnacsdk, loading Api on first use since it pulls in requests. A
+    module level __getattr__ would need Python 3.7.
+    """
+
+    def __getattr__(self, name):
+        if name == "Api":
+            from .api import Api
+            return Api
+        raise AttributeError("module {!r} has no attribute {!r}".format(self.__name__, name))
+
+
+sys.modules[__name__].__class__ = __Package__
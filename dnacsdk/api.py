@@ -1,10 +1,17 @@
 import json
 import requests
-import util as util
-import exceptions
-import datetime
+from . import util
+from . import exceptions
 import logging
-import jwt
+import threading
+import time
+import random
+import email.utils
+from requests.adapters import HTTPAdapter
+from .rateLimit import RateLimiter
+from .cache import SingleFlight
+from .metrics import endpoint_of
+from .jsonCodec import get_codec, iter_json_items
 
 class Api(object):
 
@@ -13,6 +20,39 @@ class Api(object):
         Usage::
             >>> import languages.python.scratch
             >>> api = dnacsdk.Api(ip="10.195.153.140", username='admin', password='Grapevine1')
+            >>> with dnacsdk.Api(ip="10.195.153.140", username='admin', password='Grapevine1', pool_maxsize=20) as api:
+            ...     api.get("/api/v1/network-device")
+
+        Optional connection settings:
+            scheme -- "https" (default), or "http" for a local stand-in controller
+            pool_connections -- number of per-host pools to keep (default 10)
+            pool_maxsize -- max keep-alive connections per host (default 10)
+            pool_block -- block instead of opening extra connections when the pool is full (default False)
+
+        Optional token settings:
+            token_store -- a dnacsdk.tokenStore.TokenStore sharing tokens across processes
+            token_refresh_margin -- seconds before JWT expiry to proactively re-authenticate (default 60)
+
+        Optional rate limit and retry settings:
+            rate_limiter -- a dnacsdk.rateLimit.RateLimiter
+            rate_limits -- dict of endpoint class to requests per second, shorthand for rate_limiter
+            max_retries -- retries of throttled (429) or failed (5xx) requests (default 3)
+            backoff_factor -- base of the exponential backoff in seconds (default 0.5)
+            max_backoff -- longest backoff in seconds, unless Retry-After asks for more (default 30)
+
+        Optional cache settings:
+            interface_cache -- a dnacsdk.cache.TTLCache of interface tables shared by every NetworkDevice using this Api
+            response_cache -- a dnacsdk.cache.ResponseCache answering repeated GETs without a request
+            coalesce -- concurrent identical GETs share a single request (default True)
+
+        Optional JSON settings:
+            json_codec -- a dnacsdk.jsonCodec codec, or its name ("json" or "orjson"), encoding
+                          request bodies and decoding responses (default orjson when installed)
+            stream_chunk_size -- bytes read at a time by get_items (default 65536)
+
+        Optional instrumentation:
+            hooks -- callables receiving an event dict for every request, retry and
+                     authentication, e.g. a dnacsdk.metrics.Metrics (see add_hook)
         """
 
         self.ip = kwargs["ip"]  # Mandatory parameter
@@ -20,65 +60,236 @@ class Api(object):
         self.password = kwargs["password"]
         self.token = None
         self.token_request_at = None
+        self.token_expires_at = None
+        self.token_store = kwargs.get("token_store")
+        self.token_refresh_margin = kwargs.get("token_refresh_margin", 60)
+        # Held while the token is replaced, so one refresh serves every thread
+        self._token_lock = threading.Lock()
+        # (token, headers) of the last headers() call
+        self._headers = None
         self.options = kwargs
-        self.endpoint = 'https://'+self.ip
+        self.endpoint = kwargs.get("scheme", "https")+'://'+self.ip
+
+        self.pool_connections = kwargs.get("pool_connections", 10)
+        self.pool_maxsize = kwargs.get("pool_maxsize", 10)
+        self.pool_block = kwargs.get("pool_block", False)
+        self._session = None
+
+        self.rate_limiter = kwargs.get("rate_limiter")
+        if self.rate_limiter is None and kwargs.get("rate_limits"):
+            self.rate_limiter = RateLimiter(kwargs["rate_limits"])
+        self.max_retries = kwargs.get("max_retries", 3)
+        self.backoff_factor = kwargs.get("backoff_factor", 0.5)
+        self.max_backoff = kwargs.get("max_backoff", 30)
+
+        self.interface_cache = kwargs.get("interface_cache")
+        self.device_epochs = {}
+        self.response_cache = kwargs.get("response_cache")
+        self.flights = SingleFlight() if kwargs.get("coalesce", True) else None
+
+        self.hooks = list(kwargs.get("hooks", []))
+
+        json_codec = kwargs.get("json_codec")
+        self.json_codec = json_codec if json_codec is not None and not isinstance(json_codec, str) \
+            else get_codec(json_codec)
+        self.stream_chunk_size = kwargs.get("stream_chunk_size", 65536)
+
+    def add_hook(self, hook):
+        """Register a callable receiving one event dict per request, retry
+        and authentication. See dnacsdk.metrics for the event fields.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def __emit__(self, event):
+        for hook in self.hooks:
+            hook(event)
+
+    @property
+    def session(self):
+        """Persistent keep-alive session shared by every request made with this Api
+        """
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                  pool_maxsize=self.pool_maxsize,
+                                  pool_block=self.pool_block)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Connection"] = "keep-alive"
+            self._session = session
+        return self._session
+
+    def close(self):
+        """Close the pooled connections. The session is recreated on next use.
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def device_epoch(self, managementIpAddress):
+        """Counter bumped whenever a device may have changed, used to expire
+        interface data memoized on NetworkDevice instances.
+        """
+        return self.device_epochs.get(managementIpAddress, 0)
+
+    def device_changed(self, managementIpAddress):
+        """Forget cached interface data of a device, e.g. after a deployment
+        """
+        self.device_epochs[managementIpAddress] = self.device_epoch(managementIpAddress) + 1
+        if self.interface_cache is not None:
+            self.interface_cache.pop(managementIpAddress)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def get_token(self):
-        """Generate new token by making a POST request
-            1. By using client credentials if validate_token_hash finds
-            token to be invalid.
+        """Return a valid token, in order of preference
+            1. The token held by this object, unless it is about to expire.
+            2. A token cached by the token store, if one is configured.
+            3. A new token, generated by making a POST request with the
+            client credentials.
+        Threads needing a new token at the same time wait for a single
+        authentication.
         """
+        token = self.__current_token__()
+        if token is not None:
+            return token
+
+        with self._token_lock:
+            # Another thread may have refreshed it while this one waited
+            token = self.__current_token__()
+            if token is not None:
+                return token
+
+            if self.token_store is None:
+                self.__set_token__(self.__authenticate__())
+                return self.token
+
+            with self.token_store.locked(self.ip, self.username):
+                token = self.token_store.load(self.ip, self.username)
+                if token is None:
+                    token = self.__authenticate__()
+                    self.token_store.save(self.ip, self.username, token)
+                self.__set_token__(token)
+
+            return self.token
+
+    def __current_token__(self):
+        """The token held, or None if there is none or it is about to expire
+        """
+        token = self.token
+        if token is None:
+            return None
+        expires_at = self.token_expires_at
+        if expires_at is not None and time.time() >= expires_at - self.token_refresh_margin:
+            return None
+        return token
+
+    def __authenticate__(self):
         path = "/api/system/v1/auth/token"
         payload={}
 
         authentication = (self.username, self.password)
 
-    #   self.validate_token()
-        if self.token is not None:
-            return self.token
-        else:
-            self.token = self.http_call(util.join_url(self.endpoint, path), "POST",verify=False, data=payload, auth=authentication)
+        self.token_request_at = time.time()
+        url = util.join_url(self.endpoint, path)
+        if self.hooks:
+            self.__emit__({"kind": "auth", "url": url, "endpoint": endpoint_of(url)})
+        return self.http_call(url, "POST",verify=False, data=payload, auth=authentication)
 
-        return self.token
+    def __set_token__(self, token):
+        exp = util.jwt_claims(token.get("Token")).get("exp") if token else None
+        # The expiry is set first, so a thread reading the new token never
+        # pairs it with the expiry of the previous one
+        self.token_expires_at = float(exp) if exp is not None else None
+        self.token = token
 
     def validate_token(self):
-        """Checks if token has expired and if so resets token
+        """Checks if token has expired, or expires within token_refresh_margin,
+        and if so resets token
         """
-        if self.token_request_at and self.token is not None:
-            current = datetime.datetime.now()
-            expires_in = jwt.decode(self.token, 'secret', options=None)
-            if current >= expires_in:
+        if self.token is not None and self.token_expires_at is not None:
+            if time.time() >= self.token_expires_at - self.token_refresh_margin:
                 self.token = None
 
+    def reset_token(self, rejected=None):
+        """Drop the current token, including any copy in the token store.
+
+        Given the token string the controller rejected, a token that has
+        already replaced it, here or in the store, is kept.
+        """
+        if rejected is not None and self.token is not None and self.token.get("Token") != rejected:
+            return
+        self.token = None
+        self.token_expires_at = None
+        if self.token_store is not None:
+            self.token_store.clear(self.ip, self.username, rejected)
+
     def headers(self):
         """Default HTTP headers
         """
         token = self.get_token()
 
-        logging.info("Token is:"+str(token['Token']))
+        cached = self._headers
+        if cached is None or cached[0] is not token:
+            logging.info("Using a new auth token")
+            cached = self._headers = (token, {
+                "X-Auth-Token": token['Token'],
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            })
+        # Shared between calls, get/post/put/delete merge it into a new dict
+        return cached[1]
 
-        return {
-            "X-Auth-Token": token['Token'],
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+    def http_call(self, url, method, stream=False, **kwargs):
+        """Makes a http call. Logs response information and reports it to the hooks.
 
-    def http_call(self, url, method, **kwargs):
-        """Makes a http call. Logs response information.
+        With stream, a successful response is returned unread (see get_items).
         """
-        logging.info('Request[%s]: %s' % (method, url))
-        start_time = datetime.datetime.now()
+        logging.info("Request[%s]: %s", method, url)
+        start_time = time.perf_counter()
 
-        logging.info("Method:"+method);
-        logging.info("URL:" + url);
+        try:
+            response = self.session.request(method, url, stream=stream, **kwargs)
+        except Exception as error:
+            if self.hooks:
+                self.__request_event__(url, method, kwargs, time.perf_counter() - start_time, error=error)
+            raise
 
-        response = requests.request(method, url, **kwargs)
+        duration = time.perf_counter() - start_time
+        logging.info("Response[%d]: %s, Duration: %.3fs.", response.status_code, response.reason, duration)
 
-        duration = datetime.datetime.now() - start_time
-        logging.info('Response[%d]: %s, Duration: %s.%ss.' % (
-        response.status_code, response.reason, duration.seconds, duration.microseconds))
+        if stream and 200 <= response.status_code <= 299:
+            if self.hooks:
+                self.__request_event__(url, method, kwargs, duration, response,
+                                       int(response.headers.get("Content-Length") or 0))
+            return response
 
-        return self.handle_response(response, response.content.decode('utf-8'))
+        # Decoded as bytes, the body is not copied into a str first
+        content = response.content
+        if self.hooks:
+            self.__request_event__(url, method, kwargs, duration, response, len(content))
+        return self.handle_response(response, content)
+
+    def __request_event__(self, url, method, kwargs, duration, response=None, received=0, error=None):
+        data = kwargs.get("data")
+        self.__emit__({
+            "kind": "request",
+            "method": method,
+            "url": url,
+            "endpoint": endpoint_of(url),
+            "status": response.status_code if response is not None else None,
+            "duration": duration,
+            "bytes_sent": len(data) if isinstance(data, (str, bytes)) else 0,
+            "bytes_received": received,
+            "error": error,
+        })
 
     def handle_response(self, response, content):
         """Validate HTTP response
@@ -87,8 +298,11 @@ class Api(object):
         if status in (301, 302, 303, 307):
             raise exceptions.Redirection(response, content)
         elif 200 <= status <= 299:
-            return json.loads(content) if content else {}
-        elif status == 400:
+            return self.json_codec.loads(content) if content else {}
+
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        if status == 400:
             raise exceptions.BadRequest(response, content)
         elif status == 401:
             raise exceptions.UnauthorizedAccess(response, content)
@@ -118,8 +332,62 @@ class Api(object):
             >>> api.get("v1/payments/payment/PAY-1234")
         """
         http_headers = util.merge_dict(self.headers(), headers or {})
+        url = util.join_url(self.endpoint, action)
+        if self.response_cache is None and self.flights is None:
+            return self.request(url, 'GET', headers=http_headers or {})
+        return self.__shared_get__(url, headers, http_headers)
+
+    def __shared_get__(self, url, headers, http_headers):
+        """GET answered from the response cache, or by the identical GET
+        already in flight, or else made and shared with both. Every caller
+        gets its own copy of the response.
+        """
+        key = (url, tuple(sorted(headers.items()))) if headers else url
+        cache = self.response_cache
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                if self.hooks:
+                    self.__saved_event__(url, "cache")
+                return self.json_codec.loads(cached)
 
-        return self.request(util.join_url(self.endpoint, action), 'GET', headers=http_headers or {})
+        encoded = []
+
+        def encode(result):
+            # Before result is handed to the caller, who may change it while
+            # the threads sharing this GET decode their copies
+            if not encoded:
+                encoded.append(self.json_codec.dumps(result))
+            return encoded[0]
+
+        def fetch():
+            generation = cache.generation if cache is not None else None
+            result = self.request(url, 'GET', headers=http_headers or {})
+            # Not the {"error": ...} returned for a bad request
+            if cache is not None and not (isinstance(result, dict) and "error" in result):
+                cache.set(key, url, encode(result), generation)
+            return result
+
+        if self.flights is None:
+            return fetch()
+        result, joined = self.flights.do(key, fetch, share = encode)
+        if not joined:
+            return result
+        if self.hooks:
+            self.__saved_event__(url, "flight")
+        return self.json_codec.loads(result)
+
+    def __saved_event__(self, url, source):
+        self.__emit__({"kind": "saved", "method": "GET", "url": url, "endpoint": endpoint_of(url),
+                       "source": source})
+
+    def __written__(self, url):
+        """Forget the GET responses a POST, PUT or DELETE to url may change
+        """
+        if self.response_cache is not None:
+            self.response_cache.invalidate(url)
+        if self.flights is not None:
+            self.flights.forget()
 
     def post(self, action, params=None, headers=None):
         """Make POST request
@@ -128,41 +396,131 @@ class Api(object):
             >>> api.post("v1/payments/payment/PAY-1234/execute", { 'payer_id': '1234' })
         """
         http_headers = util.merge_dict(self.headers(), headers or {})
-        return self.request(util.join_url(self.endpoint, action), 'POST', body=params or {}, headers=http_headers or {})
+        url = util.join_url(self.endpoint, action)
+        try:
+            return self.request(url, 'POST', body=params or {}, headers=http_headers or {})
+        finally:
+            self.__written__(url)
 
     def put(self, action, params=None, headers=None):
         """Make PUT request
         Usage::
             >>> api.put("v1/invoicing/invoices/INV2-RUVR-ADWQ", { 'id': 'INV2-RUVR-ADWQ', 'status': 'DRAFT'})
         """
-        return self.request(util.join_url(self.endpoint, action), 'PUT', body=params or {}, headers=headers or {})
+        http_headers = util.merge_dict(self.headers(), headers or {})
+        url = util.join_url(self.endpoint, action)
+        try:
+            return self.request(url, 'PUT', body=params or {}, headers=http_headers or {})
+        finally:
+            self.__written__(url)
 
 
     def delete(self, action, headers=None):
         """Make DELETE request
         """
-        return self.request(util.join_url(self.endpoint, action), 'DELETE', headers=headers or {})
+        http_headers = util.merge_dict(self.headers(), headers or {})
+        url = util.join_url(self.endpoint, action)
+        try:
+            return self.request(url, 'DELETE', headers=http_headers or {})
+        finally:
+            self.__written__(url)
 
-    def request(self, url, method, body=None, headers=None):
+    def get_items(self, action, key="response", headers=None):
+        """Make GET request and iterate over the items of the key array of
+        the JSON response as they are parsed, without holding the whole body.
+        Errors are raised here, before iterating.
+        Usage::
+            >>> for device in api.get_items("/api/v1/network-device"):
+            ...     print(device["hostname"])
+        """
+        http_headers = util.merge_dict(self.headers(), headers or {})
+        response = self.request(util.join_url(self.endpoint, action), 'GET', headers=http_headers or {},
+                                stream=True)
+        if isinstance(response, dict):  # e.g. the error of a bad request
+            return iter(response.get(key) or [])
+        return self.__iter_items__(response, key)
+
+    def __iter_items__(self, response, key):
+        with response:
+            for item in iter_json_items(response.iter_content(self.stream_chunk_size), key):
+                yield item
+
+    def request(self, url, method, body=None, headers=None, stream=False):
         """Make HTTP call, formats response and does error handling. Uses http_call method in API class.
         Usage::
             >>> api.request("https://api.sandbox.paypal.com/v1/payments/payment?count=10", "GET", {})
             >>> api.request("https://api.sandbox.paypal.com/v1/payments/payment", "POST", "{}", {} )
         """
-        try:
-            return self.http_call(url, method, data=json.dumps(body), verify=False,headers=headers)
+        attempt = 0
+        refreshed = False
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            try:
+                return self.http_call(url, method, data=self.json_codec.dumps(body), verify=False,headers=headers,
+                                      stream=stream)
 
-        # Format Error message for bad request
-        except exceptions.BadRequest as error:
-            return {"error": json.loads(error.content)}
+            # Format Error message for bad request
+            except exceptions.BadRequest as error:
+                return {"error": json.loads(error.content)}
 
-        # Handle Expired token
-        except exceptions.UnauthorizedAccess as error:
-            if self.token and self.username and self.password:
-                self.token = None
-                return self.request(url, method, body, headers)
-            else:
-                raise error
+            # Handle Expired token, once, with a freshly issued one. Every
+            # thread rejected with the same token shares one refresh.
+            except exceptions.UnauthorizedAccess as error:
+                rejected = (headers or {}).get("X-Auth-Token")
+                if refreshed or not (rejected and self.username and self.password):
+                    raise error
+                with self._token_lock:
+                    self.reset_token(rejected)
+                refreshed = True
+                headers = util.merge_dict(headers or {}, {"X-Auth-Token": self.get_token()["Token"]})
+
+            # Throttling, server and network errors are retried with backoff
+            except (exceptions.ClientError, exceptions.ServerError,
+                    requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                delay = self.retry_delay(method, error, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                logging.info("Retrying %s %s in %.2fs (attempt %d): %s", method, url, delay, attempt, error)
+                if self.hooks:
+                    self.__emit__({"kind": "retry", "method": method, "url": url, "endpoint": endpoint_of(url),
+                                   "attempt": attempt, "delay": delay, "error": error})
+                if self.rate_limiter is not None:
+                    self.rate_limiter.pause(url, delay)
+                time.sleep(delay)
+
+    def retry_delay(self, method, error, attempt):
+        """Seconds to wait before retrying a failed request, or None to give up.
+
+        429 and 503 are retried for every method since the controller did not
+        act on the request. Other 5xx and network errors are only retried for
+        idempotent methods, so a deployment is never submitted twice.
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        if status in (429, 503):
+            pass
+        elif method in ("GET", "PUT", "DELETE") and (status is None or status >= 500):
+            pass
+        else:
+            return None
+
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+
+        retry_after = response.headers.get("Retry-After") if status is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                retry_at = email.utils.parsedate_tz(retry_after)
+                if retry_at is not None:
+                    delay = max(delay, email.utils.mktime_tz(retry_at) - time.time())
+        return delay
 
 
     __api__ = None
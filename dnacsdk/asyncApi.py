@@ -0,0 +1,525 @@
+"""Sample usage
+import asyncio
+from dnacsdk.asyncApi import AsyncApi, AsyncNetworkDevice, AsyncTemplate, wait_for_deployments
+
+async def onboard(ports):
+    async with AsyncApi(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+                        concurrency=50) as dnacp:
+        devices = await AsyncNetworkDevice.resolve_many(dnacp, [port["target"] for port in ports])
+        template = await AsyncTemplate.get_by_name(dnacp, "NetworkDeviceOnboarding")
+        results = await template.deploy_many(dnacp,
+            [(devices[port["target"]].managementIpAddress, port["params"]) for port in ports])
+        return await wait_for_deployments(dnacp, [result["deploymentId"] for result in results])
+
+asyncio.get_event_loop().run_until_complete(onboard(ports))
+
+Requires aiohttp (pip install -r requirements-async.txt).
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+
+import aiohttp
+
+from . import util
+from . import exceptions
+from .api import Api
+from .jsonCodec import get_codec
+from .deploymentTracker import deployment_state, DeploymentTracker, TERMINAL_STATES
+from .networkDevice import NetworkDevice
+from .templateProgrammer import Template, TemplateCatalog
+
+
+class ResponseInfo(object):
+    """requests style view (status_code, reason, headers) of an aiohttp
+    response, so Api.handle_response and the exceptions work unchanged.
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    def get(self, key, default = None):
+        return self.headers.get(key, default)
+
+
+class AsyncApi(object):
+
+    def __init__(self, **kwargs):
+        """Create an asyncio API object
+        Usage::
+            >>> async with dnacsdk.asyncApi.AsyncApi(ip="10.195.153.140", username='admin', password='Grapevine1') as api:
+            ...     devices = await api.get("/api/v1/network-device")
+
+        Optional settings:
+            scheme -- "https" (default), or "http" for a local stand-in controller
+            concurrency -- requests in flight at once (default 50)
+            pool_maxsize -- max keep-alive connections (default concurrency)
+            token_store -- a dnacsdk.tokenStore.TokenStore sharing tokens across processes
+            token_refresh_margin -- seconds before JWT expiry to proactively re-authenticate (default 60)
+            json_codec -- a dnacsdk.jsonCodec codec, or its name (default orjson when installed)
+        """
+
+        self.ip = kwargs["ip"]  # Mandatory parameter
+        self.username = kwargs["username"]  # Mandatory parameter
+        self.password = kwargs["password"]
+        self.token = None
+        self.token_request_at = None
+        self.token_expires_at = None
+        self.token_store = kwargs.get("token_store")
+        self.token_refresh_margin = kwargs.get("token_refresh_margin", 60)
+        self.options = kwargs
+        self.endpoint = kwargs.get("scheme", "https")+'://'+self.ip
+
+        self.concurrency = kwargs.get("concurrency", 50)
+        self.pool_maxsize = kwargs.get("pool_maxsize", self.concurrency)
+        self._session = None
+        self._semaphore = None
+        self._token_lock = None
+
+        json_codec = kwargs.get("json_codec")
+        self.json_codec = json_codec if json_codec is not None and not isinstance(json_codec, str) \
+            else get_codec(json_codec)
+
+    # Token bookkeeping and response handling are shared with Api
+    __set_token__ = Api.__set_token__
+    validate_token = Api.validate_token
+    handle_response = Api.handle_response
+
+    async def __in_thread__(self, function, *args):
+        """Run a blocking call, e.g. on the token store and its file lock,
+        outside the event loop
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, function, *args)
+
+    async def reset_token(self, rejected=None):
+        """Drop the current token, including any copy in the token store,
+        like Api.reset_token
+        """
+        if rejected is not None and self.token is not None and self.token.get("Token") != rejected:
+            return
+        self.token = None
+        self.token_expires_at = None
+        if self.token_store is not None:
+            await self.__in_thread__(self.token_store.clear, self.ip, self.username, rejected)
+
+    @property
+    def session(self):
+        """Persistent keep-alive session, created on first use inside the event loop
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit = self.pool_maxsize, ssl = False)
+            self._session = aiohttp.ClientSession(connector = connector)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._token_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def get_token(self):
+        """Return a valid token, authenticating at most once however many
+        coroutines ask for it at the same time.
+        """
+        self.validate_token()
+        if self.token is not None:
+            return self.token
+
+        self.session  # creates the token lock inside the running loop
+        async with self._token_lock:
+            self.validate_token()
+            if self.token is not None:
+                return self.token
+
+            token = None
+            if self.token_store is not None:
+                token = await self.__in_thread__(self.token_store.load, self.ip, self.username)
+            if token is None:
+                token = await self.__authenticate__()
+                if self.token_store is not None:
+                    await self.__in_thread__(self.token_store.save, self.ip, self.username, token)
+            self.__set_token__(token)
+
+        return self.token
+
+    async def __authenticate__(self):
+        path = "/api/system/v1/auth/token"
+
+        self.token_request_at = time.time()
+        return await self.http_call(util.join_url(self.endpoint, path), "POST",
+                                    auth=aiohttp.BasicAuth(self.username, self.password))
+
+    async def headers(self):
+        """Default HTTP headers
+        """
+        token = await self.get_token()
+
+        return {
+            "X-Auth-Token": token['Token'],
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+
+    async def http_call(self, url, method, **kwargs):
+        """Makes a http call, at most `concurrency` at a time.
+        """
+        session = self.session
+        async with self._semaphore:
+            logging.info('Request[%s]: %s', method, url)
+            start_time = time.time()
+            async with session.request(method, url, **kwargs) as response:
+                content = await response.read()
+            logging.info('Response[%d]: %s, Duration: %.3fs.',
+                         response.status, response.reason, time.time() - start_time)
+
+        return self.handle_response(ResponseInfo(response), content)
+
+    async def get(self, action, headers=None):
+        return await self.request(util.join_url(self.endpoint, action), 'GET', headers=headers)
+
+    async def post(self, action, params=None, headers=None):
+        return await self.request(util.join_url(self.endpoint, action), 'POST', body=params or {}, headers=headers)
+
+    async def put(self, action, params=None, headers=None):
+        return await self.request(util.join_url(self.endpoint, action), 'PUT', body=params or {}, headers=headers)
+
+    async def delete(self, action, headers=None):
+        return await self.request(util.join_url(self.endpoint, action), 'DELETE', headers=headers)
+
+    async def request(self, url, method, body=None, headers=None):
+        """Make HTTP call, formats response and does error handling, like Api.request.
+        An expired token is refreshed and the call retried once.
+        """
+        for attempt in (1, 2):
+            http_headers = util.merge_dict(await self.headers(), headers or {})
+            try:
+                return await self.http_call(url, method, data=self.json_codec.dumps(body), headers=http_headers)
+
+            # Format Error message for bad request
+            except exceptions.BadRequest as error:
+                return {"error": json.loads(error.content)}
+
+            # Handle Expired token, unless another coroutine already replaced it
+            except exceptions.UnauthorizedAccess:
+                if attempt == 2 or not (self.username and self.password):
+                    raise
+                await self.reset_token(http_headers["X-Auth-Token"])
+
+
+class AsyncNetworkDevice(NetworkDevice):
+    """NetworkDevice operations for an AsyncApi. Whatever the synchronous
+    class fetches on demand is awaited here: get() instead of the
+    constructor, get_info(), get_field() and get_interfaces(). info and
+    interfaces only return what was already fetched.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, dnacp, deviceId = None, managementIpAddress = None,
+                 hostname = None, serialNumber = None):
+        raise TypeError("Use await AsyncNetworkDevice.get(dnacp, ...) to look up a device.")
+
+    @property
+    def info(self):
+        if not self._info_complete:
+            raise TypeError("The full record of {} is not loaded, use await device.get_info()."
+                .format(self.hostname))
+        return self._info
+
+    def field(self, name, default = None):
+        if name in self.FIELDS or (self._info is not None and name in self._info) or self._info_complete:
+            return NetworkDevice.field(self, name, default)
+        raise TypeError("{} of {} is not loaded, use await device.get_field({!r})."
+            .format(name, self.hostname, name))
+
+    async def get_field(self, name, default = None):
+        """A record field, fetching the full record if it was not retained
+        """
+        if name in self.FIELDS:
+            return getattr(self, name)
+        if self._info is not None and name in self._info:
+            return self._info[name]
+        return (await self.get_info()).get(name, default)
+
+    @property
+    def interfaces(self):
+        if self._interfaces is None:
+            raise TypeError("The interfaces of {} are not loaded, use await device.get_interfaces()."
+                .format(self.hostname))
+        return self._interfaces
+
+    async def refresh(self):
+        """Re-read the interfaces from the controller
+        """
+        self.invalidate()
+        return await self.get_interfaces()
+
+    @classmethod
+    def iter_interfaces_many(cls, devices, max_workers = 8, fetch = None):
+        raise TypeError("Use await AsyncNetworkDevice.interfaces_many(devices).")
+
+    @classmethod
+    async def get(cls, dnacp, deviceId = None, managementIpAddress = None,
+                  hostname = None, serialNumber = None):
+        if not hostname is None:
+            devices = await cls.resolve_many(dnacp, [hostname])
+            return devices[hostname]
+        elif not deviceId is None:
+            api = "/api/v1/network-device/{}".format(deviceId)
+        elif not serialNumber is None:
+            api = "/api/v1/network-device/serial-number/{}".format(serialNumber)
+        elif not managementIpAddress is None:
+            api = "/api/v1/network-device/ip-address/{}".format(managementIpAddress)
+        else:
+            raise exceptions.MissingParam("One of deviceId, serialNumber, "
+                                          "managementIpAddress or hostname is required.")
+
+        return cls.from_info(dnacp, (await dnacp.get(api))["response"])
+
+    @classmethod
+    async def get_all(cls, dnacp, retain = None):
+        return [device async for device in cls.iter_all(dnacp, retain = retain)]
+
+    @classmethod
+    async def iter_all(cls, dnacp, page_size = None, retain = None, **filters):
+        page_size = page_size or cls.PAGE_SIZE
+        offset = 1
+        while True:
+            page = (await dnacp.get(cls.__records_url__(offset, page_size, filters)))["response"]
+            for record in page:
+                yield cls.from_info(dnacp, record, retain)
+            if len(page) < page_size:
+                return
+            offset += len(page)
+
+    @classmethod
+    async def resolve_many(cls, dnacp, keys, ignore_missing = False, retain = None):
+        """Resolve hostnames and/or management IPs, sending all the batched
+        filter queries at once.
+        """
+        keys = list(dict.fromkeys(keys))
+        queries = []
+        for field in ("hostname", "managementIpAddress"):
+            values = [key for key in keys if cls.__is_ip__(key) == (field != "hostname")]
+            queries.extend((field, api) for api in cls.__filter_urls__(field, values))
+
+        pages = await asyncio.gather(*[dnacp.get(api) for field, api in queries])
+
+        found = {}
+        wanted = set(keys)
+        for (field, api), page in zip(queries, pages):
+            for record in page["response"]:
+                if record.get(field) in wanted:
+                    found[record[field]] = record
+
+        missing = [key for key in keys if key not in found]
+        if missing and not ignore_missing:
+            raise exceptions.DeviceNotFound(missing)
+
+        return dict((key, cls.from_info(dnacp, found[key], retain))
+                    for key in keys if key in found)
+
+    async def get_info(self):
+        """The full device record, fetched if only some fields were retained
+        """
+        if not self._info_complete:
+            self._info = (await self.dnacp.get("/api/v1/network-device/{}".format(self.id)))["response"]
+            self._info_complete = True
+        return self._info
+
+    async def iter_interfaces(self, page_size = None):
+        page_size = page_size or self.PAGE_SIZE
+        start = 1
+        while True:
+            try:
+                page = (await self.dnacp.get(
+                    self.__interfaces_url__(self.id, start, page_size)))["response"]
+            except exceptions.ResourceNotFound:
+                return
+            for record in page:
+                yield record
+            if len(page) < page_size:
+                return
+            start += len(page)
+
+    async def get_interfaces(self):
+        """Dict of portName to interface record, read from the controller and
+        kept for the interfaces property
+        """
+        self._interfaces = {interface["portName"]: interface
+                            async for interface in self.iter_interfaces()}
+        return self._interfaces
+
+    @classmethod
+    async def interfaces_many(cls, devices):
+        """List of (device, interfaces dict) for many devices, fetched
+        concurrently within the AsyncApi concurrency limit.
+        """
+        devices = list(devices)
+        tables = await asyncio.gather(*[device.get_interfaces() for device in devices])
+        return list(zip(devices, tables))
+
+
+class AsyncTemplate(Template):
+    """Template operations for an AsyncApi. info, versions, latest_version
+    and input_params are read once load() has fetched them (get_by_name
+    does), and raise TypeError before.
+    """
+
+    def __init__(self, dnacp, templateId = None, name = None):
+        if templateId is None:
+            raise TypeError("Use await AsyncTemplate.get_by_name(dnacp, name) to look up a template by name.")
+        Template.__init__(self, dnacp, templateId = templateId, name = name)
+
+    def __loaded__(self, attribute, what):
+        value = getattr(self, attribute)
+        if value is None:
+            raise TypeError("The {} of template {} are not loaded, use await template.load()."
+                .format(what, self._name or self.id))
+        return value
+
+    @property
+    def info(self):
+        return self.__loaded__("_info", "details")
+
+    @property
+    def versions(self):
+        return self.__loaded__("_versions", "versions")
+
+    @property
+    def latest_version(self):
+        return self.versions[1]
+
+    @property
+    def input_params(self):
+        return [param["parameterName"] for param in self.info["templateParams"]]
+
+    @classmethod
+    async def catalog(cls, dnacp):
+        summaries = await dnacp.get("/api/v1/template-programmer/template")
+        return TemplateCatalog(dnacp, summaries = summaries, template_class = cls)
+
+    @classmethod
+    async def get_all(cls, dnacp):
+        templates = (await cls.catalog(dnacp)).templates()
+        await asyncio.gather(*[template.load(versions = False) for template in templates])
+        return templates
+
+    @classmethod
+    async def get_by_name(cls, dnacp, name):
+        template = (await cls.catalog(dnacp)).get(name)
+        await template.load()
+        return template
+
+    async def load(self, versions = True):
+        """Fetch the template body and, optionally, its versions concurrently
+        """
+        pending = []
+        if self._info is None:
+            pending.append(("_info", "/api/v1/template-programmer/template/{}".format(self.id)))
+        if versions and self._versions is None:
+            pending.append(("_versions", "/api/v1/template-programmer/template/version/{}".format(self.id)))
+
+        responses = await asyncio.gather(*[self.dnacp.get(api) for attribute, api in pending])
+        for (attribute, api), response in zip(pending, responses):
+            if attribute == "_versions":
+                response = response[0]["versionsInfo"]
+            setattr(self, attribute, response)
+        return self
+
+    async def deploy(self, dnacp, target_device_ip, params):
+        await self.load()
+        if not self.__deploy_param_check__(params):
+            raise ValueError("Provided deploy parameters invalid.")
+
+        deployment = await dnacp.post("/api/v1/template-programmer/template/deploy",
+                self.__deploy_body__([(target_device_ip, params)])
+            )
+
+        return deployment["deploymentId"]
+
+    async def deploy_many(self, dnacp, targets, batch_size = None):
+        """Like Template.deploy_many, with the deploy requests sent concurrently
+        """
+        await self.load()
+        targets = list(targets)
+        batches = self.__deploy_batches__(targets, batch_size)
+
+        async def submit(batch):
+            try:
+                deployment = await dnacp.post("/api/v1/template-programmer/template/deploy",
+                        self.__deploy_body__([targets[position] for position in batch.values()])
+                    )
+                return self.__deploy_result__(deployment)
+            except exceptions.ConnectionError as exc:
+                return None, str(exc)
+
+        results = [None] * len(targets)
+        outcomes = await asyncio.gather(*[submit(batch) for batch in batches])
+        for batch, (deploymentId, error) in zip(batches, outcomes):
+            self.__record_results__(results, batch, deploymentId, error)
+        return results
+
+    @classmethod
+    async def deployment_status(cls, dnacp, deploymentId):
+        api = "/api/v1/template-programmer/template/deploy/status/{}".format(
+            deploymentId
+        )
+        return await dnacp.get(api)
+
+
+async def wait_for_deployments(dnacp, deploymentIds, initial_delay = 1.0, max_delay = 30.0,
+                               factor = 2.0, jitter = 0.5, timeout = None, max_unknown = None):
+    """Poll deployments concurrently with exponential backoff and jitter
+    until each is terminal or timeout expires, like DeploymentTracker.wait.
+    An unknown deploymentId, or one whose polls failed or were answered
+    without any state max_unknown times in a row (default
+    DeploymentTracker.MAX_UNKNOWN_POLLS), ends as ERROR. Returns a dict of
+    deploymentId to last known state.
+    """
+    max_unknown = DeploymentTracker.MAX_UNKNOWN_POLLS if max_unknown is None else max_unknown
+    deadline = None if timeout is None else time.time() + timeout
+    states = dict((deploymentId, None) for deploymentId in deploymentIds
+                  if deploymentId is not None)
+
+    async def follow(deploymentId):
+        delay = initial_delay
+        unknown = 0
+        while True:
+            await asyncio.sleep(delay * random.uniform(1 - jitter, 1 + jitter))
+            try:
+                state = deployment_state(await AsyncTemplate.deployment_status(dnacp, deploymentId))
+            except exceptions.ResourceNotFound:
+                # Unknown or expired deploymentId, it will not turn up later
+                state = "ERROR"
+            except (exceptions.ConnectionError, aiohttp.ClientError, asyncio.TimeoutError):
+                state = None
+            unknown = unknown + 1 if state in (None, "UNKNOWN") else 0
+            if unknown >= max_unknown:
+                state = "ERROR"
+            if state in TERMINAL_STATES:
+                states[deploymentId] = state
+                return
+            if state is not None:
+                delay = initial_delay if state != states[deploymentId] else min(delay * factor, max_delay)
+                states[deploymentId] = state
+            else:
+                delay = min(delay * factor, max_delay)
+            if deadline is not None and time.time() + delay > deadline:
+                return
+
+    await asyncio.gather(*[follow(deploymentId) for deploymentId in states])
+    return states
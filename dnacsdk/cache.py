@@ -0,0 +1,203 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.cache import TTLCache, ResponseCache
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            interface_cache=TTLCache(maxsize=2000, ttl=300))
+
+# GET responses reused for 30 seconds, templates for 5 minutes, and
+# dropped when anything is posted to the same endpoint class
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            response_cache=ResponseCache(ttl=30, ttls={"/api/v1/template-programmer/template": 300}))
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from .rateLimit import endpoint_class
+
+
+class TTLCache(object):
+    """Thread safe mapping whose entries expire after a time to live, with
+    the least recently used entry evicted once maxsize is reached.
+    """
+
+    def __init__(self, maxsize = 1024, ttl = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default = None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last = False)
+
+    def pop(self, key, default = None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def discard(self, predicate):
+        """Remove every entry whose key matches predicate, returning how many
+        """
+        with self.lock:
+            keys = [key for key in self.entries if predicate(key)]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ResponseCache(object):
+    """GET responses of an Api, keyed by URL, each kept for the time to live
+    of the longest matching path prefix in ttls (0 to never cache it), or
+    ttl otherwise.
+
+    A POST, PUT or DELETE drops the cached responses of its endpoint class
+    (see dnacsdk.rateLimit) and of the classes it is related to, so a
+    deployment also drops cached inventory. Responses are stored encoded,
+    each hit is decoded afresh and callers never share the same object.
+    """
+
+    # GETs whose answer changes without a write through this Api
+    UNCACHED = ("/api/v1/template-programmer/template/deploy/status", "/api/v1/task")
+    # Endpoint classes also invalidated by a write to the key class
+    RELATED = {"template-programmer": ("inventory",)}
+
+    def __init__(self, maxsize = 512, ttl = 30, ttls = None, related = None):
+        self.entries = TTLCache(maxsize = maxsize, ttl = ttl)
+        ttls = dict(dict.fromkeys(self.UNCACHED, 0), **(ttls or {}))
+        self.ttls = sorted(ttls.items(), key = lambda item: len(item[0]), reverse = True)
+        self.related = self.RELATED if related is None else related
+        # Bumped by every invalidation, so a response read before a write
+        # and returned after it is not stored
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def ttl_for(self, url):
+        path = urlparse(url).path
+        for prefix, ttl in self.ttls:
+            if path.startswith(prefix):
+                return ttl
+        return self.entries.ttl
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, url, value, generation):
+        ttl = self.ttl_for(url)
+        if ttl <= 0:
+            return
+        with self.lock:
+            if generation == self.generation:
+                self.entries.set(key, value, ttl)
+
+    def invalidate(self, url):
+        """Drop the responses a write to url may have changed
+        """
+        written = endpoint_class(url)
+        classes = (written,) + tuple(self.related.get(written, ()))
+        with self.lock:
+            self.generation += 1
+            return self.entries.discard(
+                lambda key: endpoint_class(key if isinstance(key, str) else key[0]) in classes)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SingleFlight(object):
+    """Runs a call once for every thread asking for the same key at the same
+    time. Threads arriving while it runs wait, and get its result or its
+    exception.
+    """
+
+    class Call(object):
+        def __init__(self):
+            self.done = threading.Event()
+            self.value = None
+            self.error = None
+            self.waiters = 0
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function, share = None):
+        """Returns (value, joined), joined being True for a thread that
+        waited on a call made by another. If given, share(value) is what
+        the waiting threads get instead of the value, and is only called
+        when some thread waits.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            joined = call is not None
+            if not joined:
+                call = self.calls[key] = self.Call()
+            call.waiters += joined
+
+        if joined:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            value = function()
+            with self.lock:
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+            # No thread joins once the call is gone
+            call.value = share(value) if share is not None and call.waiters else value
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+            call.done.set()
+        return value, False
+
+    def forget(self):
+        """Make later callers start new calls rather than join the running
+        ones, e.g. after a write that may change their answer
+        """
+        with self.lock:
+            self.calls.clear()
@@ -0,0 +1,268 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.cluster import Cluster
+
+cluster = Cluster({
+    "emea": Api(ip="10.10.22.74", username=DNAC_USERNAME, password=DNAC_PASSWORD),
+    "apac": Api(ip="10.20.22.74", username=DNAC_USERNAME, password=DNAC_PASSWORD),
+})
+
+# Looked up on every controller at once, the owner of each device is
+# remembered and asked alone next time
+devices = cluster.resolve_many(["cat_9k_1.abc.inc", "10.20.30.1"])
+print(cluster.owner(devices["cat_9k_1.abc.inc"].dnacp))
+
+# Sent to the controller managing each target, controllers in parallel
+results = cluster.deploy_many("NetworkDeviceOnboarding", [
+    ("cat_9k_1.abc.inc", {"INTERFACE": "Gi1/0/1", "VLAN": "1001", "INTERFACE_DESCRIPTION": "Camera"}),
+    ("10.20.30.1", {"INTERFACE": "Gi1/0/2", "VLAN": "2001", "INTERFACE_DESCRIPTION": "Printer"}),
+])
+"""
+
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .cache import TTLCache
+from .exceptions import ClusterError, DeviceNotFound
+from .networkDevice import NetworkDevice
+from .templateProgrammer import TemplateCatalog
+
+
+class Cluster(object):
+    """Several DNA Center controllers, e.g. one per region, used as one.
+
+    Lookups go to every controller in parallel, so they take as long as the
+    slowest one rather than the sum. The controller owning each device is
+    cached by hostname and management IP, and later lookups of that device
+    only ask its owner.
+    """
+
+    # Seconds the template catalog of a controller is reused
+    CATALOG_TTL = 60
+
+    def __init__(self, controllers, owner_cache = None, max_workers = None, catalog_ttl = None):
+        """
+            controllers -- dict of name to Api, in order of preference for a device found on several
+            owner_cache -- a dnacsdk.cache.TTLCache of hostname or IP to controller name
+                           (default 100000 entries for an hour)
+            max_workers -- controllers queried at once (default all of them)
+            catalog_ttl -- seconds a template catalog is reused (default CATALOG_TTL)
+        """
+        self.controllers = OrderedDict(controllers)
+        if not self.controllers:
+            raise ValueError("A cluster needs at least one controller.")
+        self.owners = owner_cache if owner_cache is not None else TTLCache(maxsize = 100000, ttl = 3600)
+        self.max_workers = max_workers or len(self.controllers)
+        self.catalog_cache = TTLCache(maxsize = len(self.controllers),
+                                      ttl = self.CATALOG_TTL if catalog_ttl is None else catalog_ttl)
+
+    @classmethod
+    def from_string(cls, spec, api_factory, **kwargs):
+        """Cluster from "emea=10.10.22.74,apac=10.20.22.74", the Api of each
+        controller built by api_factory(ip), as read from DNAC_CLUSTERS by
+        onboard.py
+        """
+        controllers = OrderedDict()
+        for item in spec.split(","):
+            name, separator, ip = item.strip().partition("=")
+            if not separator or not name.strip() or not ip.strip():
+                raise ValueError("Expected name=ip in cluster list, got {!r}".format(item))
+            controllers[name.strip()] = api_factory(ip.strip())
+        return cls(controllers, **kwargs)
+
+    def __iter__(self):
+        return iter(self.controllers.items())
+
+    def __len__(self):
+        return len(self.controllers)
+
+    def owner(self, dnacp):
+        """Name of the controller an Api belongs to, e.g. device.dnacp
+        """
+        for name, api in self.controllers.items():
+            if api is dnacp:
+                return name
+        raise KeyError("Api for {} is not part of this cluster.".format(getattr(dnacp, "ip", dnacp)))
+
+    def run(self, calls):
+        """Run (name, function, args) calls, each with the Api of the named
+        controller as first argument, in parallel. Returns [(name, result)]
+        in the order given. ClusterError is raised once every call is done if
+        any failed, with the results of the others.
+        """
+        calls = list(calls)
+        results = [None] * len(calls)
+        errors = {}
+        with ThreadPoolExecutor(max_workers = min(self.max_workers, len(calls)) or 1) as executor:
+            futures = dict((executor.submit(function, self.controllers[name], *args), position)
+                           for position, (name, function, args) in enumerate(calls))
+            for future in as_completed(futures):
+                position = futures[future]
+                name = calls[position][0]
+                try:
+                    results[position] = (name, future.result())
+                except Exception as error:
+                    errors[name] = error
+        if errors:
+            raise ClusterError(errors, [result for result in results if result is not None])
+        return results
+
+    def map(self, function, *args):
+        """function(dnacp, *args) on every controller in parallel, returning
+        a dict of controller name to result in controller order
+        """
+        return OrderedDict(self.run((name, function, args) for name in self.controllers))
+
+    def get_token(self):
+        """Authenticate with every controller at once
+        """
+        self.map(lambda dnacp: dnacp.get_token())
+
+    def __remember__(self, name, device):
+        self.owners.set(device.hostname, name)
+        self.owners.set(device.managementIpAddress, name)
+
+    def resolve_many(self, keys, ignore_missing = False, retain = None):
+        """Resolve hostnames and/or management IPs on the controllers owning
+        them, like NetworkDevice.resolve_many. Keys with a cached owner are
+        asked of that controller, the others of every controller. Each
+        device's dnacp is the Api of its controller.
+        """
+        keys = list(dict.fromkeys(keys))
+        owned = OrderedDict()
+        unknown = []
+        for key in keys:
+            owner = self.owners.get(key)
+            if owner in self.controllers:
+                owned.setdefault(owner, []).append(key)
+            else:
+                unknown.append(key)
+
+        found = {}
+        calls = [(name, NetworkDevice.resolve_many, (names, True, retain))
+                 for name, names in owned.items()]
+        for name, devices in self.run(calls):
+            found.update(devices)
+        # Owned keys not found any more, e.g. a device moved to another controller
+        unknown += [key for names in owned.values() for key in names if key not in found]
+
+        if unknown:
+            calls = [(name, NetworkDevice.resolve_many, (unknown, True, retain))
+                     for name in self.controllers]
+            matches = OrderedDict((key, []) for key in unknown)
+            for name, devices in self.run(calls):
+                for key, device in devices.items():
+                    matches[key].append((name, device))
+            for key, candidates in matches.items():
+                if not candidates:
+                    continue
+                if len(candidates) > 1:
+                    logging.warning("%s is managed by %s, using %s", key,
+                                    ", ".join(name for name, device in candidates), candidates[0][0])
+                found[key] = candidates[0][1]
+
+        for key, device in found.items():
+            self.__remember__(self.owner(device.dnacp), device)
+
+        missing = [key for key in keys if key not in found]
+        if missing and not ignore_missing:
+            raise DeviceNotFound(missing)
+        return OrderedDict((key, found[key]) for key in keys if key in found)
+
+    def controller_of(self, key):
+        """Name of the controller managing a hostname or IP
+        """
+        owner = self.owners.get(key)
+        if owner in self.controllers:
+            return owner
+        return self.owner(self.resolve_many([key])[key].dnacp)
+
+    def iter_all(self, retain = None, **filters):
+        """Yield (controller name, NetworkDevice) for every device of every
+        controller. The controllers are read in parallel and each one's
+        devices are yielded once it has answered, fastest first.
+        """
+        def read(dnacp):
+            return list(NetworkDevice.iter_all(dnacp, retain = retain, **filters))
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+            futures = dict((executor.submit(read, api), name) for name, api in self.controllers.items())
+            errors = {}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    devices = future.result()
+                except Exception as error:
+                    errors[name] = error
+                    continue
+                for device in devices:
+                    self.__remember__(name, device)
+                    yield name, device
+            if errors:
+                raise ClusterError(errors)
+
+    def catalog(self, name):
+        """Template catalog of a controller, reused for CATALOG_TTL seconds
+        """
+        catalog = self.catalog_cache.get(name)
+        if catalog is None:
+            catalog = TemplateCatalog(self.controllers[name])
+            self.catalog_cache.set(name, catalog)
+        return catalog
+
+    def catalogs(self):
+        """Dict of controller name to template catalog, listed in parallel
+        """
+        return self.map(lambda dnacp: self.catalog(self.owner(dnacp)))
+
+    def deploy(self, template_name, target, params, **kwargs):
+        """Deploy a template to one hostname or IP through its controller.
+        Returns the deploymentId like Template.deploy, see controller_of for
+        the controller to follow it on.
+        """
+        device = self.resolve_many([target])[target]
+        template = self.catalog(self.owner(device.dnacp)).get(template_name)
+        return template.deploy(device.dnacp, device.managementIpAddress, params, **kwargs)
+
+    def deploy_many(self, template_name, targets, batch_size = None, diff = False, **diff_options):
+        """Deploy a template to many (hostname or IP, params) pairs, each
+        through its controller, controllers in parallel.
+
+        Every target is resolved and validated against its controller's copy
+        of the template before anything is sent. Returns the result dicts of
+        Template.deploy_many in order, with the controller name added.
+        """
+        targets = list(targets)
+        devices = self.resolve_many([target for target, params in targets])
+
+        groups = OrderedDict()
+        for position, (target, params) in enumerate(targets):
+            name = self.owner(devices[target].dnacp)
+            groups.setdefault(name, []).append(position)
+
+        templates = dict(self.run(
+            (name, lambda dnacp: self.catalog(self.owner(dnacp)).get(template_name), ())
+            for name in groups))
+        for name, positions in groups.items():
+            templates[name].__validate_targets__(
+                [(devices[targets[position][0]].managementIpAddress, targets[position][1])
+                 for position in positions])
+
+        def deploy(dnacp, positions):
+            owned = dict((devices[targets[position][0]].managementIpAddress, devices[targets[position][0]])
+                         for position in positions)
+            options = dict(diff_options)
+            if diff:
+                options["devices"] = dict(options.get("devices") or {}, **owned)
+            return templates[self.owner(dnacp)].deploy_many(
+                dnacp, [(devices[targets[position][0]].managementIpAddress, targets[position][1])
+                        for position in positions],
+                batch_size = batch_size, diff = diff, **options)
+
+        results = [None] * len(targets)
+        for name, group_results in self.run((name, deploy, (positions,)) for name, positions in groups.items()):
+            for position, result in zip(groups[name], group_results):
+                result["controller"] = name
+                results[position] = result
+        return results
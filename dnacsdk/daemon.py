@@ -0,0 +1,208 @@
+"""Sample usage
+from dnacsdk.daemon import CommandServer, forward, default_socket_path
+
+# In the long running process, run each forwarded command line
+def run(argv, cwd, stdout, stderr):
+    stdout.write("ran {}\\n".format(argv))
+    return 0
+
+CommandServer(default_socket_path(), run, key = "10.10.22.74|admin").serve_forever()
+
+# In a short lived process, returns the exit code, or None if no server
+# for that key is running and the command must run locally
+exit_code = forward(default_socket_path(), sys.argv[1:], key = "10.10.22.74|admin")
+
+Wire format, one JSON document per line:
+    client -> server   {"argv": [...], "cwd": "...", "key": "..."}
+    server -> client   {"out": "..."} / {"err": "..."} as output is written,
+                       then {"exit": code}, or {"refused": reason}
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+try:
+    UnixStreamServer = socketserver.UnixStreamServer
+except AttributeError:  # Windows, commands always run locally, see forward()
+    UnixStreamServer = socketserver.TCPServer
+
+
+def default_socket_path():
+    """$DNACSDK_SOCKET or ~/.cache/dnacsdk/onboard.sock
+    """
+    return os.environ.get("DNACSDK_SOCKET") or os.path.join(
+        os.path.expanduser("~"), ".cache", "dnacsdk", "onboard.sock")
+
+
+class StreamWriter(object):
+    """Text stream sending everything written to it to the client, as it is
+    written, so streamed command output stays streamed.
+    """
+
+    encoding = "utf-8"
+    errors = "replace"
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+
+    def write(self, text):
+        # click may wrap this stream and write encoded bytes
+        if isinstance(text, (bytes, bytearray)):
+            text = bytes(text).decode(self.encoding, self.errors)
+        if text:
+            self.connection.send_message({self.name: text})
+        return len(text)
+
+    def writable(self):
+        return True
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        socketserver.StreamRequestHandler.setup(self)
+        self.send_lock = threading.Lock()
+
+    def send_message(self, message):
+        with self.send_lock:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+        except ValueError:
+            return
+        if request.get("key") != self.server.key:
+            self.send_message({"refused": "serving another controller, user or settings"})
+            return
+        try:
+            exit_code = self.server.run(request["argv"], request.get("cwd") or os.getcwd(),
+                                        StreamWriter(self, "out"), StreamWriter(self, "err"))
+            self.send_message({"exit": exit_code})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class CommandServer(socketserver.ThreadingMixIn, UnixStreamServer):
+    """Unix socket server running command lines on behalf of thin clients.
+
+    The socket is created with 0600 permissions in a 0700 directory. A stale
+    socket left by a crashed server is replaced, a live one is an error.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, run, key = None):
+        """
+            path -- Unix socket path
+            run -- callable(argv, cwd, stdout, stderr) returning the exit code
+            key -- clients giving another key are refused, e.g. the controller and user served
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix sockets are not available on this platform")
+        self.path = path
+        self.run = run
+        self.key = key
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(path):
+            if is_serving(path):
+                raise RuntimeError("A server is already listening on {}".format(path))
+            os.unlink(path)
+
+        umask = os.umask(0o177)
+        try:
+            UnixStreamServer.__init__(self, path, CommandHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def is_serving(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except (OSError, socket.error):
+        return False
+    finally:
+        probe.close()
+
+
+def silence(stream):
+    """Point a stream whose reader is gone at /dev/null, so the interpreter
+    does not fail flushing it on exit
+    """
+    try:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        pass
+
+
+def forward(path, argv, key = None, stdout = None, stderr = None):
+    """Run a command line on the server listening on path, copying its output
+    to stdout and stderr as it arrives. Returns the exit code, or None if no
+    server is running, it serves another key or the platform has no Unix
+    sockets.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (OSError, socket.error):
+        client.close()
+        return None
+
+    with client, client.makefile("rb") as replies:
+        client.sendall(json.dumps({"argv": list(argv), "cwd": os.getcwd(), "key": key})
+                       .encode("utf-8") + b"\n")
+        try:
+            for line in replies:
+                message = json.loads(line.decode("utf-8"))
+                if "out" in message:
+                    stdout.write(message["out"])
+                    stdout.flush()
+                elif "err" in message:
+                    stderr.write(message["err"])
+                    stderr.flush()
+                elif "exit" in message:
+                    return message["exit"]
+                elif "refused" in message:
+                    return None
+        except BrokenPipeError:
+            # The reader went away, e.g. `| head`. Closing the socket stops
+            # the command on the server, and the exit is quiet.
+            for stream in (stdout, stderr):
+                silence(stream)
+            return 128 + getattr(signal, "SIGPIPE", 13)
+    raise RuntimeError("The server on {} closed the connection before the command finished".format(path))
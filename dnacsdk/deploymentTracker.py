@@ -0,0 +1,212 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.templateProgrammer import Template
+from dnacsdk.deploymentTracker import DeploymentTracker
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+tracker = DeploymentTracker(dnacp)
+
+results = template.deploy_many(dnacp, targets)
+tracker.track(result["deploymentId"] for result in results)
+
+for deploymentId, status, response in tracker.changes():
+    print(deploymentId, status)
+
+final = tracker.wait(timeout = 600)
+
+# Deployments of other controllers are polled on the Api given with them
+tracker.track(apac_deploymentIds, dnacp = apac_dnacp)
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .exceptions import ConnectionError, ResourceNotFound
+from .templateProgrammer import Template
+
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "FAILED", "ERROR", "CANCELLED")
+FAILED_STATES = ("FAILURE", "FAILED", "ERROR", "CANCELLED")
+
+
+def deployment_state(response):
+    """Overall state of a deployment status response. Falls back to
+    combining the per-device states when no top level status is given.
+    An error response, e.g. for an unknown or expired deploymentId, is
+    ERROR.
+    """
+    if "error" in response:
+        return "ERROR"
+    if response.get("status"):
+        return response["status"]
+
+    states = [device.get("status") for device in response.get("devices") or []]
+    if not states:
+        return "UNKNOWN"
+    if len(set(states)) == 1:
+        return states[0]
+    if any(state not in TERMINAL_STATES for state in states):
+        return "IN_PROGRESS"
+    if any(state in FAILED_STATES for state in states):
+        return "FAILURE"
+    return "SUCCESS"
+
+
+class DeploymentGroup(object):
+    """Deployment IDs submitted together, polled in the same round and
+    sharing one backoff schedule.
+    """
+
+    def __init__(self, deploymentIds, delay):
+        self.deploymentIds = deploymentIds
+        self.delay = delay
+        self.next_poll_at = time.time()
+
+
+class DeploymentTracker(object):
+    """Polls many deployment IDs concurrently with exponential backoff and
+    jitter until each reaches a terminal state.
+    """
+
+    # Consecutive polls failed or answered without any state before a
+    # deployment is given up as ERROR
+    MAX_UNKNOWN_POLLS = 10
+
+    def __init__(self, dnacp, max_workers = 8, initial_delay = 1.0, max_delay = 30.0,
+                 factor = 2.0, jitter = 0.5, max_unknown = None):
+        """
+            max_workers -- status requests in flight at once
+            initial_delay -- seconds before the first poll of a new group and after a change
+            max_delay -- upper bound on the delay between polls of a group
+            factor -- delay multiplier applied after a poll that saw no change
+            jitter -- fraction of the delay randomised, spreading polls of different groups
+            max_unknown -- consecutive failed or UNKNOWN polls before giving up (default MAX_UNKNOWN_POLLS)
+        """
+        self.dnacp = dnacp
+        self.max_workers = max_workers
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.max_unknown = self.MAX_UNKNOWN_POLLS if max_unknown is None else max_unknown
+
+        self.groups = []
+        self.states = {}
+        self.responses = {}
+        # Consecutive failed or UNKNOWN polls of each deployment
+        self.unknown = {}
+        # Api of the deployments tracked on another controller than dnacp
+        self.controllers = {}
+
+    def track(self, deploymentIds, dnacp = None):
+        """Start tracking the given IDs as one group. IDs already tracked,
+        and None (failed submissions), are ignored. dnacp is the Api of the
+        controller they were submitted to, if not the tracker's.
+        """
+        deploymentIds = [deploymentId for deploymentId in dict.fromkeys(deploymentIds)
+                         if deploymentId is not None and deploymentId not in self.states]
+        if not deploymentIds:
+            return None
+
+        for deploymentId in deploymentIds:
+            self.states[deploymentId] = None
+            if dnacp is not None and dnacp is not self.dnacp:
+                self.controllers[deploymentId] = dnacp
+        group = DeploymentGroup(deploymentIds, self.initial_delay)
+        group.next_poll_at += self.__jittered__(self.initial_delay)
+        self.groups.append(group)
+        return group
+
+    def is_done(self, deploymentId):
+        return self.states.get(deploymentId) in TERMINAL_STATES
+
+    @property
+    def pending(self):
+        return [deploymentId for deploymentId in self.states
+                if not self.is_done(deploymentId)]
+
+    def __jittered__(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def __fetch__(self, deploymentId):
+        """(deploymentId, status response), the response None if the poll
+        failed and may succeed later
+        """
+        try:
+            return deploymentId, Template.deployment_status(
+                self.controllers.get(deploymentId, self.dnacp), deploymentId)
+        except ResourceNotFound as error:
+            # Unknown or expired deploymentId, it will not turn up later
+            return deploymentId, {"error": str(error)}
+        except (ConnectionError, requests.exceptions.RequestException) as error:
+            # Other failures count as "no change" and back off
+            return deploymentId, None
+
+    def __state__(self, deploymentId, response):
+        """State of a status response, None for a failed poll (response
+        None), and ERROR once max_unknown polls in a row failed or were
+        answered without any state
+        """
+        state = "UNKNOWN" if response is None else deployment_state(response)
+        if state != "UNKNOWN":
+            self.unknown.pop(deploymentId, None)
+            return state
+        self.unknown[deploymentId] = self.unknown.get(deploymentId, 0) + 1
+        if self.unknown[deploymentId] >= self.max_unknown:
+            return "ERROR"
+        return None if response is None else state
+
+    def changes(self, timeout = None):
+        """Yield (deploymentId, state, response) whenever a tracked
+        deployment changes state, until all are terminal or timeout expires.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+            while True:
+                self.groups = [group for group in self.groups
+                               if not all(self.is_done(deploymentId)
+                                          for deploymentId in group.deploymentIds)]
+                if not self.groups:
+                    return
+
+                now = time.time()
+                next_poll_at = min(group.next_poll_at for group in self.groups)
+                if deadline is not None and next_poll_at > deadline:
+                    return
+                if next_poll_at > now:
+                    time.sleep(next_poll_at - now)
+                    continue
+
+                due = [group for group in self.groups if group.next_poll_at <= now]
+                deploymentIds = [deploymentId for group in due
+                                 for deploymentId in group.deploymentIds
+                                 if not self.is_done(deploymentId)]
+
+                changed = set()
+                for deploymentId, response in executor.map(self.__fetch__, deploymentIds):
+                    state = self.__state__(deploymentId, response)
+                    if state is None:
+                        continue
+                    self.responses[deploymentId] = response or {"error": "Deployment status unavailable."}
+                    if state != self.states[deploymentId]:
+                        self.states[deploymentId] = state
+                        changed.add(deploymentId)
+                        yield deploymentId, state, response
+
+                for group in due:
+                    if changed.intersection(group.deploymentIds):
+                        group.delay = self.initial_delay
+                    else:
+                        group.delay = min(group.delay * self.factor, self.max_delay)
+                    group.next_poll_at = time.time() + self.__jittered__(group.delay)
+
+    def wait(self, timeout = None):
+        """Block until every tracked deployment is terminal or timeout
+        expires. Returns a dict of deploymentId to last known state.
+        """
+        for _ in self.changes(timeout = timeout):
+            pass
+        return dict(self.states)
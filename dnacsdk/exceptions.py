@@ -33,6 +33,26 @@ class MissingConfig(Exception):
     pass
 
 
+class DeviceNotFound(LookupError):
+    """No network device matched the requested hostname or IP
+    """
+    def __init__(self, keys):
+        self.keys = list(keys)
+        super(DeviceNotFound, self).__init__(
+            "No network device found for: " + ", ".join(self.keys))
+
+
+class ClusterError(Exception):
+    """One or more controllers of a Cluster failed. results holds the
+    (name, result) pairs of those that did not, if any.
+    """
+    def __init__(self, errors, results = None):
+        self.errors = dict(errors)
+        self.results = list(results or [])
+        super(ClusterError, self).__init__("; ".join(
+            "{}: {}".format(name, error) for name, error in sorted(self.errors.items())))
+
+
 class ClientError(ConnectionError):
     """4xx Client Error
     """
@@ -0,0 +1,216 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.inventoryIndex import InventoryIndex
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+index = InventoryIndex(InventoryIndex.default_path(DNAC_IP))
+
+index.sync_devices(dnacp)
+device = index.find_device("switch1")
+index.sync_interfaces(dnacp, device["id"])
+interface = index.interfaces(device["id"])["GigabitEthernet1/0/3"]
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .networkDevice import NetworkDevice
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS devices (
+    id TEXT PRIMARY KEY,
+    hostname TEXT,
+    management_ip TEXT,
+    serial TEXT,
+    mac TEXT,
+    family TEXT,
+    info TEXT NOT NULL,
+    digest TEXT
+);
+CREATE INDEX IF NOT EXISTS devices_hostname ON devices (hostname);
+CREATE INDEX IF NOT EXISTS devices_management_ip ON devices (management_ip);
+CREATE INDEX IF NOT EXISTS devices_serial ON devices (serial);
+CREATE INDEX IF NOT EXISTS devices_mac ON devices (mac);
+CREATE TABLE IF NOT EXISTS interfaces (
+    device_id TEXT NOT NULL,
+    port_name TEXT NOT NULL,
+    info TEXT NOT NULL,
+    PRIMARY KEY (device_id, port_name)
+);
+CREATE INDEX IF NOT EXISTS interfaces_port_name ON interfaces (port_name);
+CREATE TABLE IF NOT EXISTS interface_sync (
+    device_id TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+# Device lookup columns, tried in order by find_device
+LOOKUP_COLUMNS = ("hostname", "management_ip", "serial", "mac", "id")
+
+
+class InventoryIndex(object):
+    """Local SQLite mirror of NetworkDevice.info and the interface records,
+    indexed by hostname, management IP, serial, MAC and port name.
+    """
+
+    def __init__(self, path = ":memory:", ttl = 900):
+        """
+            path -- SQLite database file
+            ttl -- seconds before device or interface data is refreshed from the controller
+        """
+        self.path = path
+        self.ttl = ttl
+        if path != ":memory:" and not os.path.isdir(os.path.dirname(path) or "."):
+            os.makedirs(os.path.dirname(path), 0o700)
+        self.db = sqlite3.connect(path, check_same_thread = False)
+        self.lock = threading.RLock()
+        with self.lock, self.db:
+            self.db.executescript(SCHEMA)
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(devices)")]
+            if "digest" not in columns:
+                # Indexes created before devices were compared by digest.
+                # Their last_update_time column is left unused.
+                self.db.execute("ALTER TABLE devices ADD COLUMN digest TEXT")
+
+    @staticmethod
+    def default_path(ip):
+        """Per controller database under $DNACSDK_INDEX_DIR or ~/.cache/dnacsdk
+        """
+        directory = os.environ.get("DNACSDK_INDEX_DIR") or os.path.join(
+            os.path.expanduser("~"), ".cache", "dnacsdk")
+        key = hashlib.sha256(ip.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(directory, "inventory-{}.sqlite".format(key))
+
+    def close(self):
+        self.db.close()
+
+    def __meta__(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def is_stale(self, synced_at):
+        return synced_at is None or time.time() - float(synced_at) >= self.ttl
+
+    def sync_devices(self, dnacp, force = False):
+        """Refresh the device table if it is older than ttl (or force).
+
+        The inventory list is fetched once and each record compared with the
+        index by a digest of its JSON, so only changed devices are rewritten
+        and only their cached interfaces are dropped. Returns the number of changed devices,
+        or None if the index was still fresh.
+        """
+        with self.lock:
+            if not force and not self.is_stale(self.__meta__("devices_synced_at")):
+                return None
+
+            records = [(record, self.__serialize__(record))
+                       for record in NetworkDevice.iter_records(dnacp)]
+
+            known = dict(self.db.execute("SELECT id, digest FROM devices"))
+            changed = [(record, serialized) for record, serialized in records
+                       if known.get(record["id"]) != serialized[1]]
+            removed = set(known) - set(record["id"] for record, serialized in records)
+
+            with self.db:
+                self.__upsert_devices__(changed)
+                for device_id in removed:
+                    self.db.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+                for device_id in removed.union(record["id"] for record, serialized in changed):
+                    self.invalidate_interfaces(device_id)
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('devices_synced_at', ?)",
+                                (str(time.time()),))
+
+            return len(changed) + len(removed)
+
+    @staticmethod
+    def __serialize__(record):
+        """(JSON text, digest) of a device record, keys sorted so the digest
+        only changes with the content
+        """
+        text = json.dumps(record, sort_keys = True)
+        return text, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def __upsert_devices__(self, records):
+        """Write (record, (JSON text, digest)) pairs
+        """
+        self.db.executemany(
+            "INSERT OR REPLACE INTO devices (id, hostname, management_ip, serial, mac, family, "
+            "info, digest) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(record["id"], record.get("hostname"), record.get("managementIpAddress"),
+              record.get("serialNumber"), record.get("macAddress"), record.get("family"),
+              text, digest)
+             for record, (text, digest) in records])
+
+    def sync_interfaces(self, dnacp, device_id, force = False):
+        """Refresh the interfaces of one device if older than ttl (or force).
+        """
+        with self.lock:
+            if not force and not self.interfaces_stale(device_id):
+                return False
+
+            self.store_interfaces(device_id,
+                                  NetworkDevice.iter_interface_records(dnacp, device_id))
+            return True
+
+    def interfaces_stale(self, device_id):
+        with self.lock:
+            row = self.db.execute("SELECT synced_at FROM interface_sync WHERE device_id = ?",
+                                  (device_id,)).fetchone()
+        return self.is_stale(row[0] if row else None)
+
+    def store_interfaces(self, device_id, interfaces):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM interfaces WHERE device_id = ?", (device_id,))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO interfaces VALUES (?, ?, ?)",
+                [(device_id, interface["portName"], json.dumps(interface))
+                 for interface in interfaces])
+            self.db.execute("INSERT OR REPLACE INTO interface_sync VALUES (?, ?)",
+                            (device_id, time.time()))
+
+    def invalidate_interfaces(self, device_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM interface_sync WHERE device_id = ?", (device_id,))
+
+    def devices(self):
+        with self.lock:
+            rows = self.db.execute("SELECT info FROM devices ORDER BY hostname").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_device(self, key):
+        """Device record matching key on hostname, management IP, serial,
+        MAC or id. Returns None if no device matches.
+        """
+        with self.lock:
+            for column in LOOKUP_COLUMNS:
+                row = self.db.execute(
+                    "SELECT info FROM devices WHERE {} = ?".format(column), (key,)).fetchone()
+                if row:
+                    return json.loads(row[0])
+        return None
+
+    def interfaces(self, device_id):
+        """Dict of portName to interface record for one device
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT port_name, info FROM interfaces WHERE device_id = ? ORDER BY rowid",
+                (device_id,)).fetchall()
+        return dict((port_name, json.loads(info)) for port_name, info in rows)
+
+    def find_interfaces(self, port_name):
+        """All (device_id, interface record) pairs with the given port name
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT device_id, info FROM interfaces WHERE port_name = ?",
+                (port_name,)).fetchall()
+        return [(device_id, json.loads(info)) for device_id, info in rows]
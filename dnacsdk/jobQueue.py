@@ -0,0 +1,517 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.jobQueue import JobQueue, DeployScheduler
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+queue = JobQueue(JobQueue.default_path(DNAC_IP))
+
+# Adding the same template, target and parameters again is a no-op, so a
+# wave can be re-queued after an interruption without duplicating work
+queue.add("NetworkDeviceOnboarding", "cat_9k_1.abc.inc",
+          {"INTERFACE": "Gi1/0/1", "VLAN": "1001", "INTERFACE_DESCRIPTION": "Camera"})
+
+# At most 50 targets in flight, one per device. Stopped at any point, the
+# next run picks up the submitted deployments and the remaining jobs.
+scheduler = DeployScheduler(queue, dnacp, max_in_flight = 50, per_device = 1)
+for job in scheduler.run():
+    print(job.id, job.target, job.state, job.status)
+
+print(queue.counts())
+"""
+
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows, concurrent schedulers are not detected
+    fcntl = None
+
+from .deploymentTracker import DeploymentTracker, TERMINAL_STATES
+from .exceptions import ConnectionError
+from .networkDevice import NetworkDevice
+from .templateProgrammer import TemplateCatalog
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    template TEXT NOT NULL,
+    target TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    controller TEXT,
+    device TEXT,
+    deployment_id TEXT,
+    status TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_deployment_id ON jobs (deployment_id);
+"""
+
+# Job states. A job is pending until sent, submitting while its deploy
+# request is in flight, submitted until the deployment finishes, then
+# succeeded, failed or skipped (unchanged with diff).
+PENDING = "pending"
+SUBMITTING = "submitting"
+SUBMITTED = "submitted"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+STATES = (PENDING, SUBMITTING, SUBMITTED, SUCCEEDED, FAILED, SKIPPED)
+FINISHED_STATES = (SUCCEEDED, FAILED, SKIPPED)
+
+COLUMNS = ("id", "template", "target", "params", "state", "controller", "device",
+           "deployment_id", "status", "error", "attempts", "created_at", "updated_at")
+
+
+class Job(object):
+    """One deployment of a template to a target, as read from the journal
+    """
+
+    def __init__(self, row):
+        for column, value in zip(COLUMNS, row):
+            setattr(self, column, value)
+        self.params = json.loads(self.params)
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def to_dict(self):
+        return dict((column, getattr(self, column)) for column in COLUMNS)
+
+
+class JobQueue(object):
+    """Durable SQLite journal of deploy jobs.
+
+    Every state change is committed before the scheduler moves on, so after
+    a crash the journal tells which jobs were never sent, which deployments
+    to follow and which are done.
+    """
+
+    def __init__(self, path = ":memory:"):
+        """
+            path -- SQLite database file
+        """
+        self.path = path
+        if path != ":memory:" and not os.path.isdir(os.path.dirname(path) or "."):
+            os.makedirs(os.path.dirname(path), 0o700)
+        self.db = sqlite3.connect(path, check_same_thread = False, timeout = 30)
+        self.lock = threading.RLock()
+        with self.lock, self.db:
+            if path != ":memory:":
+                # Lets `add` run while a scheduler works through the queue
+                self.db.execute("PRAGMA journal_mode = WAL")
+            self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def default_path(ip):
+        """Per controller journal under $DNACSDK_INDEX_DIR or ~/.cache/dnacsdk
+        """
+        directory = os.environ.get("DNACSDK_INDEX_DIR") or os.path.join(
+            os.path.expanduser("~"), ".cache", "dnacsdk")
+        key = hashlib.sha256(ip.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(directory, "jobs-{}.sqlite".format(key))
+
+    def close(self):
+        self.db.close()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold the journal for one scheduler. Raises RuntimeError if another
+        process is already running this queue.
+        """
+        if fcntl is None or self.path == ":memory:":
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                raise RuntimeError("Another scheduler is running the jobs in {}.".format(self.path))
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def job_key(template, target, params):
+        return hashlib.sha256(json.dumps([template, target, params], sort_keys = True)
+                              .encode("utf-8")).hexdigest()
+
+    def add(self, template, target, params):
+        """Queue a deployment. Returns False if the same template, target and
+        parameters are already in the journal, whatever their state.
+        """
+        return self.add_many([(template, target, params)]) == 1
+
+    def add_many(self, jobs):
+        """Queue (template, target, params) tuples in one transaction,
+        returning the number actually added.
+        """
+        now = time.time()
+        with self.lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO jobs (key, template, target, params, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.job_key(template, target, params), template, target, json.dumps(params),
+                  PENDING, now, now)
+                 for template, target, params in jobs])
+            return self.db.total_changes - before
+
+    def __select__(self, where = "", args = ()):
+        return "SELECT {} FROM jobs {} ORDER BY id".format(", ".join(COLUMNS), where), args
+
+    def jobs(self, states = None):
+        """Jobs in the given states (default all), oldest first
+        """
+        if states is None:
+            query = self.__select__()
+        else:
+            query = self.__select__("WHERE state IN ({})".format(", ".join("?" * len(states))),
+                                    tuple(states))
+        with self.lock:
+            rows = self.db.execute(*query).fetchall()
+        return [Job(row) for row in rows]
+
+    def iter_ready(self):
+        """Pending jobs whose device is resolved, oldest first, read lazily
+        """
+        with self.lock:
+            cursor = self.db.execute(*self.__select__(
+                "WHERE state = ? AND device IS NOT NULL", (PENDING,)))
+        for row in cursor:
+            yield Job(row)
+
+    def unresolved(self):
+        """Pending jobs not yet matched to a device
+        """
+        with self.lock:
+            rows = self.db.execute(*self.__select__(
+                "WHERE state = ? AND device IS NULL", (PENDING,))).fetchall()
+        return [Job(row) for row in rows]
+
+    def get(self, job_ids):
+        """Jobs with the given ids, oldest first
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+        with self.lock:
+            rows = self.db.execute(*self.__select__(
+                "WHERE id IN ({})".format(", ".join("?" * len(job_ids))), tuple(job_ids))).fetchall()
+        return [Job(row) for row in rows]
+
+    def by_deployment(self, deployment_id):
+        with self.lock:
+            rows = self.db.execute(*self.__select__(
+                "WHERE deployment_id = ? AND state = ?", (deployment_id, SUBMITTED))).fetchall()
+        return [Job(row) for row in rows]
+
+    def counts(self):
+        """Dict of state to number of jobs
+        """
+        with self.lock:
+            counts = dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return dict((state, counts.get(state, 0)) for state in STATES)
+
+    def in_flight(self):
+        """Counter of (controller, device) to jobs being submitted or deployed
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT controller, device, COUNT(*) FROM jobs WHERE state IN (?, ?) "
+                "GROUP BY controller, device", (SUBMITTING, SUBMITTED)).fetchall()
+        return collections.Counter(dict(((controller, device), count)
+                                        for controller, device, count in rows))
+
+    def submitted(self):
+        """(controller, deployment_id) of the deployments being followed,
+        in the order they were sent
+        """
+        with self.lock:
+            return self.db.execute(
+                "SELECT controller, deployment_id FROM jobs WHERE state = ? "
+                "GROUP BY controller, deployment_id ORDER BY MIN(id)", (SUBMITTED,)).fetchall()
+
+    def update(self, job_ids, **fields):
+        """Set columns of the given jobs, e.g. state, in one transaction
+        """
+        fields["updated_at"] = time.time()
+        assignments = ", ".join("{} = ?".format(column) for column in fields)
+        with self.lock, self.db:
+            self.db.executemany("UPDATE jobs SET {} WHERE id = ?".format(assignments),
+                                [tuple(fields.values()) + (job_id,) for job_id in job_ids])
+
+    def assign(self, devices):
+        """Record the (controller, management IP) of jobs, given as a dict of
+        job id to that pair
+        """
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany("UPDATE jobs SET controller = ?, device = ?, updated_at = ? WHERE id = ?",
+                                [(controller, device, now, job_id)
+                                 for job_id, (controller, device) in devices.items()])
+
+    def claim(self, job_ids):
+        """Mark jobs submitting, counting the attempt, before their deploy
+        request is sent
+        """
+        with self.lock, self.db:
+            self.db.executemany("UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? "
+                                "WHERE id = ?", [(SUBMITTING, time.time(), job_id) for job_id in job_ids])
+
+    def requeue_interrupted(self):
+        """Return jobs left submitting by a crash to pending. Their deploy
+        request may or may not have reached the controller, so they are
+        sent again. Returns the number of jobs requeued.
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                                   (PENDING, time.time(), SUBMITTING)).rowcount
+
+    def retry_failed(self):
+        """Queue failed jobs again, looking their device up afresh
+        """
+        with self.lock, self.db:
+            return self.db.execute(
+                "UPDATE jobs SET state = ?, controller = NULL, device = NULL, deployment_id = NULL, "
+                "status = NULL, error = NULL, updated_at = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED)).rowcount
+
+    def clear(self, states = FINISHED_STATES):
+        """Delete jobs in the given states (default finished), so they can be
+        queued again. Returns the number deleted.
+        """
+        with self.lock, self.db:
+            return self.db.execute("DELETE FROM jobs WHERE state IN ({})".format(
+                ", ".join("?" * len(states))), tuple(states)).rowcount
+
+
+class DeployScheduler(object):
+    """Works through a JobQueue with Template.deploy_many, following the
+    deployments with a DeploymentTracker.
+
+    No more than max_in_flight jobs are submitted and unfinished at once,
+    nor more than per_device on a single device. Jobs are sent as soon as
+    a slot frees, so the controller sees a steady load instead of a wave.
+    """
+
+    def __init__(self, queue, dnacp = None, cluster = None, max_in_flight = 100, per_device = 1,
+                 batch_size = None, diff = False, diff_options = None, **tracker_options):
+        """
+            queue -- the JobQueue to run
+            dnacp -- Api of the controller, or
+            cluster -- a dnacsdk.cluster.Cluster, each job going to the controller of its target
+            max_in_flight -- most jobs submitted and not yet finished
+            per_device -- most jobs submitted and not yet finished per device
+            batch_size -- most targets sent in one deploy request
+            diff -- skip jobs whose interface already matches (see Template.diff_targets)
+            diff_options -- keyword arguments of Template.diff_targets
+            tracker_options -- keyword arguments of DeploymentTracker, e.g. max_delay
+        """
+        if (dnacp is None) == (cluster is None):
+            raise ValueError("Give either dnacp or cluster.")
+        if max_in_flight < 1 or per_device < 1:
+            raise ValueError("max_in_flight and per_device must be at least 1.")
+        self.queue = queue
+        self.dnacp = dnacp
+        self.cluster = cluster
+        self.max_in_flight = max_in_flight
+        self.per_device = per_device
+        self.batch_size = batch_size
+        self.diff = diff
+        self.diff_options = diff_options or {}
+        self.tracker_options = tracker_options
+        self.catalogs = {}
+        self.templates = {}
+
+    def api(self, controller):
+        """Api of a controller name (None without a cluster)
+        """
+        return self.dnacp if self.cluster is None else self.cluster.controllers[controller]
+
+    def catalog(self, controller):
+        if self.cluster is not None:
+            return self.cluster.catalog(controller)
+        if controller not in self.catalogs:
+            self.catalogs[controller] = TemplateCatalog(self.dnacp)
+        return self.catalogs[controller]
+
+    def template(self, controller, name):
+        """The controller's template of that name, loaded with its versions,
+        or None if it does not exist
+        """
+        key = (controller, name)
+        if key not in self.templates:
+            catalog = self.catalog(controller)
+            self.templates[key] = catalog.prefetch([catalog.get(name)], versions = True)[0] \
+                if name in catalog else None
+        return self.templates[key]
+
+    def __resolve__(self, targets):
+        """Dict of target to (controller name, NetworkDevice) for the known ones
+        """
+        if self.cluster is not None:
+            devices = self.cluster.resolve_many(targets, ignore_missing = True)
+            return dict((target, (self.cluster.owner(device.dnacp), device))
+                        for target, device in devices.items())
+        devices = NetworkDevice.resolve_many(self.dnacp, targets, ignore_missing = True)
+        return dict((target, (None, device)) for target, device in devices.items())
+
+    def __prepare__(self):
+        """Match newly queued jobs with their device and check their template
+        and parameters, failing those that cannot be deployed. Returns the
+        failed jobs.
+        """
+        jobs = self.queue.unresolved()
+        if not jobs:
+            return []
+        devices = self.__resolve__(list(dict.fromkeys(job.target for job in jobs)))
+
+        assigned = {}
+        failed = collections.OrderedDict()
+        for job in jobs:
+            if job.target not in devices:
+                failed.setdefault("Device not found.", []).append(job.id)
+                continue
+            controller, device = devices[job.target]
+            template = self.template(controller, job.template)
+            if template is None:
+                failed.setdefault("Template not found.", []).append(job.id)
+            elif sorted(template.input_params) != sorted(job.params):
+                failed.setdefault("Expected parameters: {}".format(
+                    ", ".join(template.input_params)), []).append(job.id)
+            else:
+                assigned[job.id] = (controller, device.managementIpAddress)
+
+        self.queue.assign(assigned)
+        for error, job_ids in failed.items():
+            self.queue.update(job_ids, state = FAILED, error = error)
+        return self.queue.get(job_id for job_ids in failed.values() for job_id in job_ids)
+
+    def __claim__(self):
+        """Pending jobs that fit in the free slots, oldest first, marked
+        submitting
+        """
+        in_flight = self.queue.in_flight()
+        total = sum(in_flight.values())
+        claimed = []
+        if total >= self.max_in_flight:
+            return claimed
+        with contextlib.closing(self.queue.iter_ready()) as ready:
+            for job in ready:
+                key = (job.controller, job.device)
+                if in_flight[key] >= self.per_device:
+                    continue
+                in_flight[key] += 1
+                total += 1
+                claimed.append(job)
+                if total >= self.max_in_flight:
+                    break
+        self.queue.claim(job.id for job in claimed)
+        return claimed
+
+    def __submit__(self, tracker):
+        """Send the jobs that fit, one deploy_many per controller and
+        template. Returns the jobs failed by __prepare__ and those sent,
+        once their submission is journaled.
+        """
+        changed = self.__prepare__()
+
+        groups = collections.OrderedDict()
+        for job in self.__claim__():
+            groups.setdefault((job.controller, job.template), []).append(job)
+
+        for (controller, name), jobs in groups.items():
+            dnacp = self.api(controller)
+            template = self.template(controller, name)
+            try:
+                results = template.deploy_many(dnacp, [(job.device, job.params) for job in jobs],
+                                                batch_size = self.batch_size, diff = self.diff,
+                                                **self.diff_options)
+            except ConnectionError:
+                # Nothing was recorded as sent, the next run starts over
+                self.queue.update([job.id for job in jobs], state = PENDING)
+                raise
+
+            # Jobs sharing a deploy request share their outcome
+            outcomes = collections.OrderedDict()
+            for job, result in zip(jobs, results):
+                if result["skipped"]:
+                    outcome = (SKIPPED, "SKIPPED", None, None)
+                elif result["deploymentId"] is None:
+                    outcome = (FAILED, None, None, result["error"])
+                else:
+                    outcome = (SUBMITTED, None, result["deploymentId"], None)
+                outcomes.setdefault(outcome, []).append(job.id)
+            for (state, status, deploymentId, error), job_ids in outcomes.items():
+                self.queue.update(job_ids, state = state, status = status,
+                                  deployment_id = deploymentId, error = error)
+            tracker.track([deploymentId for state, status, deploymentId, error in outcomes
+                           if deploymentId is not None], dnacp = dnacp)
+            changed += self.queue.get(job.id for job in jobs)
+        return changed
+
+    def __finish__(self, deploymentId, state, response):
+        """Record a deployment state change on its jobs, returning them
+        """
+        devices = dict((device.get("deviceId"), device) for device in response.get("devices") or [])
+        outcomes = collections.OrderedDict()
+        for job in self.queue.by_deployment(deploymentId):
+            device = devices.get(job.device, {})
+            status = device.get("status") or state
+            outcome = (("status", status),)
+            if state in TERMINAL_STATES:
+                outcome += (("state", SUCCEEDED), ) if status == "SUCCESS" else \
+                    (("state", FAILED), ("error", device.get("detailedStatusMessage") or status))
+            outcomes.setdefault(outcome, []).append(job.id)
+        for outcome, job_ids in outcomes.items():
+            self.queue.update(job_ids, **dict(outcome))
+        return self.queue.get(job_id for job_ids in outcomes.values() for job_id in job_ids)
+
+    def run(self, timeout = None):
+        """Submit and follow the queued jobs until none is left or timeout
+        expires, yielding every job whose state or status changed.
+
+        Deployments submitted by an earlier, interrupted run are followed
+        rather than sent again. Raises RuntimeError if another scheduler is
+        running the same journal.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.queue.locked():
+            self.queue.requeue_interrupted()
+            tracker = DeploymentTracker(None, **self.tracker_options)
+            for controller, deploymentId in self.queue.submitted():
+                tracker.track([deploymentId], dnacp = self.api(controller))
+
+            while deadline is None or time.time() < deadline:
+                submitted = self.__submit__(tracker)
+                for job in submitted:
+                    yield job
+                if not tracker.pending:
+                    if not submitted:
+                        # Nothing left that can be sent
+                        return
+                    continue
+
+                remaining = None if deadline is None else max(deadline - time.time(), 0)
+                for deploymentId, state, response in tracker.changes(timeout = remaining):
+                    for job in self.__finish__(deploymentId, state, response):
+                        yield job
+                    if state in TERMINAL_STATES:
+                        for job in self.__submit__(tracker):
+                            yield job
@@ -0,0 +1,172 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.jsonCodec import get_codec, iter_json_items
+
+# orjson is used when installed, unless DNACSDK_JSON=json
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            json_codec=get_codec("orjson"))
+
+# Items of the "response" array, parsed as the body arrives
+for device in dnacp.get_items("/api/v1/network-device"):
+    print(device["hostname"])
+
+# The same over any iterable of byte chunks
+with open("devices.json", "rb") as payload:
+    for device in iter_json_items(iter(lambda: payload.read(65536), b"")):
+        print(device["hostname"])
+"""
+
+import codecs
+import json
+import os
+
+
+class StdlibCodec(object):
+    """The json module. loads takes str or bytes, so response bodies need not
+    be decoded first.
+    """
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """orjson, several times faster than the json module. dumps returns bytes,
+    which is sent as the request body as is.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def dumps(self, obj):
+        return self.orjson.dumps(obj)
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+CODECS = {"json": StdlibCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name = None):
+    """Codec by name, or by default $DNACSDK_JSON, else orjson when it is
+    installed and the json module otherwise.
+    """
+    name = name or os.environ.get("DNACSDK_JSON")
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError("Unknown JSON codec {}, expected one of {}".format(
+                name, ", ".join(sorted(CODECS))))
+        return CODECS[name]()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return StdlibCodec()
+
+
+class JsonStreamReader(object):
+    """Decodes JSON values one at a time from an iterable of byte chunks,
+    holding at most one chunk plus the value being decoded.
+    """
+
+    WHITESPACE = " \t\r\n"
+    # Characters that may follow a complete value
+    DELIMITERS = WHITESPACE + ",:]}"
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def more(self):
+        """Append the next chunk to the buffer, False at end of input
+        """
+        if self.eof:
+            return False
+        for chunk in self.chunks:
+            text = self.text.decode(chunk)
+            if text:
+                break
+        else:
+            text = self.text.decode(b"", final = True)
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Next character other than whitespace, or "" at end of input
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in self.WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.more():
+                return ""
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError("Expected one of {!r} in JSON stream, got {!r}".format(
+                characters, character or "end of input"))
+        self.position += 1
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number cut by the end of the buffer, e.g. "2.5" of
+                # "2.5e-3", continues in the next chunk
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in self.DELIMITERS):
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def iter_json_items(chunks, key = "response"):
+    """Yield the items of the array under key in a top level JSON object,
+    e.g. the records of {"response": [...], "version": "1.0"}, as they are
+    parsed from an iterable of byte chunks. A value under key that is not
+    an array is yielded as the only item.
+    """
+    reader = JsonStreamReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        elif name == key:
+            yield reader.value()
+        else:
+            reader.value()
+        if reader.expect(",}") == "}":
+            return
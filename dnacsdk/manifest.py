@@ -0,0 +1,90 @@
+"""Sample usage
+from dnacsdk.manifest import read_manifest
+
+rows = read_manifest("floor3.csv", default_template = "NetworkDeviceOnboarding")
+
+Manifests hold one deployment per row, with a target (hostname or
+management IP), an optional template and the template parameters.
+
+CSV, with a header row. Every column except target and template is a
+parameter:
+
+    target,template,INTERFACE,VLAN,INTERFACE_DESCRIPTION
+    switch1,NetworkDeviceOnboarding,GigabitEthernet1/0/3,3001,Camera 12
+
+NDJSON (.ndjson or .jsonl), one object per line, and YAML (.yaml or .yml),
+a list of objects. Parameters are either nested under "params" or given
+inline next to target and template:
+
+    {"target": "switch1", "params": {"INTERFACE": "GigabitEthernet1/0/3", "VLAN": "3001"}}
+"""
+
+import csv
+import json
+import os
+
+RESERVED_KEYS = ("target", "template", "params")
+
+
+class ManifestRow(object):
+    def __init__(self, line, target, template, params):
+        self.line = line
+        self.target = target
+        self.template = template
+        self.params = params
+
+    @classmethod
+    def from_dict(cls, line, record, default_template = None):
+        if not isinstance(record, dict):
+            raise ValueError("Line {}: expected an object, got {!r}.".format(line, record))
+        if isinstance(record.get("params"), dict):
+            params = record["params"]
+        else:
+            params = dict((key, value) for key, value in record.items()
+                          if key not in RESERVED_KEYS)
+        params = dict((key, "" if value is None else str(value))
+                      for key, value in params.items())
+        return cls(line, record.get("target"), record.get("template") or default_template,
+                   params)
+
+
+def read_manifest(path, default_template = None, format = None):
+    """Read a CSV, YAML or NDJSON manifest into a list of ManifestRow.
+    The format is taken from the file extension unless given.
+    """
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip(".").lower()
+
+    with open(path) as manifest:
+        if format == "csv":
+            # Line 1 is the header
+            records = list(enumerate(csv.DictReader(manifest), start = 2))
+        elif format in ("ndjson", "jsonl"):
+            records = [(line, json.loads(text))
+                       for line, text in enumerate(manifest, start = 1) if text.strip()]
+        elif format in ("yaml", "yml"):
+            records = read_yaml(manifest)
+        else:
+            raise ValueError("Unsupported manifest format: {}".format(format))
+
+    return [ManifestRow.from_dict(line, record, default_template)
+            for line, record in records]
+
+
+def read_yaml(manifest):
+    """(line, record) pairs of a YAML list, each record numbered by the
+    line it starts on
+    """
+    import yaml
+
+    loader = yaml.SafeLoader(manifest)
+    try:
+        node = loader.get_single_node()
+        if node is None:
+            return []
+        records = loader.construct_document(node)
+    finally:
+        loader.dispose()
+    if not isinstance(records, list):
+        raise ValueError("Expected a list of objects, got {}.".format(type(records).__name__))
+    return [(item.start_mark.line + 1, record) for item, record in zip(node.value, records)]
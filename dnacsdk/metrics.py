@@ -0,0 +1,219 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.metrics import Metrics
+
+metrics = Metrics()
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD, hooks=[metrics])
+
+devices = NetworkDevice.get_all(dnacp)
+
+print(metrics.summary())
+metrics.write_prometheus("/var/lib/node_exporter/textfile/dnacsdk.prom")
+
+Hooks are called with one dict per event:
+    {"kind": "request", "method", "url", "endpoint", "status", "duration",
+     "bytes_sent", "bytes_received", "error"}   -- every HTTP attempt
+    {"kind": "retry", "method", "url", "endpoint", "attempt", "delay", "error"}
+    {"kind": "auth", "url", "endpoint"}          -- every token request
+    {"kind": "saved", "method", "url", "endpoint", "source"}
+                 -- a GET answered by the response cache ("cache") or by
+                    the identical GET in flight ("flight"), without a request
+"""
+
+import json
+import os
+import re
+import threading
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+# Latency histogram bucket upper bounds, in seconds, finer below 100ms
+# where most controller calls and every local one fall
+BUCKETS = (0.001, 0.002, 0.003, 0.004, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.025, 0.03, 0.04,
+           0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+VERSION_SEGMENT = re.compile(r"^v\d+$")
+
+
+def endpoint_of(url):
+    """URL path with ids replaced by {id} and the query dropped, e.g.
+    /api/v1/interface/network-device/{id}/{id}/{id}
+    """
+    segments = urlparse(url).path.split("/")
+    return "/".join("{id}" if re.search(r"\d", segment) and not VERSION_SEGMENT.match(segment)
+                    else segment for segment in segments)
+
+
+class EndpointStats(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.buckets = [0] * len(BUCKETS)
+        self.duration_sum = 0.0
+        self.duration_min = None
+        self.duration_max = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.saved = 0
+
+    def quantile(self, fraction):
+        """Quantile estimated from the histogram by linear interpolation,
+        within the fastest and slowest request seen
+        """
+        if not self.requests:
+            return 0.0
+        rank = fraction * self.requests
+        lower, seen = 0.0, 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            if count and seen + count >= rank:
+                # The observed extremes are tighter edges than the bucket's
+                low = max(lower, self.duration_min)
+                high = min(bound, self.duration_max)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.duration_max
+
+
+class Metrics(object):
+    """Hook aggregating per endpoint request counters, latency histograms,
+    bytes in/out, retries, requests saved by caching and auth refreshes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.auth_refreshes = 0
+
+    def __call__(self, event):
+        with self.lock:
+            if event["kind"] == "auth":
+                self.auth_refreshes += 1
+                return
+
+            key = (event.get("method"), event["endpoint"])
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+
+            if event["kind"] == "retry":
+                stats.retries += 1
+                return
+            if event["kind"] == "saved":
+                stats.saved += 1
+                return
+
+            stats.requests += 1
+            status = event.get("status")
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status is None or status >= 400:
+                stats.errors += 1
+            duration = event.get("duration") or 0.0
+            stats.duration_sum += duration
+            stats.duration_min = duration if stats.duration_min is None else min(stats.duration_min, duration)
+            stats.duration_max = duration if stats.duration_max is None else max(stats.duration_max, duration)
+            for position, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats.buckets[position] += 1
+                    break
+            stats.bytes_sent += event.get("bytes_sent") or 0
+            stats.bytes_received += event.get("bytes_received") or 0
+
+    def rows(self):
+        with self.lock:
+            return [[method, endpoint, stats.requests, stats.errors, stats.retries, stats.saved,
+                     round(stats.quantile(0.5) * 1000, 1), round(stats.quantile(0.99) * 1000, 1),
+                     stats.bytes_sent, stats.bytes_received]
+                    for (method, endpoint), stats in sorted(self.endpoints.items())]
+
+    def summary(self):
+        import tabulate
+        headers = ["Method", "Endpoint", "Requests", "Errors", "Retries", "Saved",
+                   "p50 ms", "p99 ms", "Bytes out", "Bytes in"]
+        rows = self.rows()
+        totals = ["", "total", sum(row[2] for row in rows), sum(row[3] for row in rows),
+                  sum(row[4] for row in rows), sum(row[5] for row in rows), "", "",
+                  sum(row[8] for row in rows), sum(row[9] for row in rows)]
+        return "{}\nAuth refreshes: {}".format(
+            tabulate.tabulate(rows + [totals], headers), self.auth_refreshes)
+
+    def to_dict(self):
+        with self.lock:
+            endpoints = []
+            for (method, endpoint), stats in sorted(self.endpoints.items()):
+                endpoints.append({
+                    "method": method,
+                    "endpoint": endpoint,
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "saved": stats.saved,
+                    "statuses": dict((str(status), count) for status, count in stats.statuses.items()),
+                    "duration_sum": stats.duration_sum,
+                    "p50": stats.quantile(0.5),
+                    "p99": stats.quantile(0.99),
+                    "buckets": dict(("+Inf" if bound == float("inf") else str(bound), count)
+                                    for bound, count in zip(BUCKETS, stats.buckets)),
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                })
+            return {"endpoints": endpoints, "auth_refreshes": self.auth_refreshes}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent = 2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format
+        """
+        lines = [
+            "# HELP dnacsdk_requests_total HTTP requests made to DNA Center.",
+            "# TYPE dnacsdk_requests_total counter",
+        ]
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            for (method, endpoint), stats in items:
+                for status, count in sorted(stats.statuses.items(), key = lambda item: str(item[0])):
+                    lines.append('dnacsdk_requests_total{{method="{}",endpoint="{}",status="{}"}} {}'
+                                 .format(method, endpoint, status if status is not None else "error", count))
+
+            lines += ["# HELP dnacsdk_request_duration_seconds HTTP request latency.",
+                      "# TYPE dnacsdk_request_duration_seconds histogram"]
+            for (method, endpoint), stats in items:
+                labels = 'method="{}",endpoint="{}"'.format(method, endpoint)
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append('dnacsdk_request_duration_seconds_bucket{{{},le="{}"}} {}'
+                                 .format(labels, le, cumulative))
+                lines.append("dnacsdk_request_duration_seconds_sum{{{}}} {}".format(labels, stats.duration_sum))
+                lines.append("dnacsdk_request_duration_seconds_count{{{}}} {}".format(labels, stats.requests))
+
+            for name, attribute, description in (
+                    ("dnacsdk_request_bytes_total", "bytes_sent", "Request body bytes sent."),
+                    ("dnacsdk_response_bytes_total", "bytes_received", "Response body bytes received."),
+                    ("dnacsdk_retries_total", "retries", "Requests retried after throttling or errors."),
+                    ("dnacsdk_requests_saved_total", "saved",
+                     "GETs answered by the response cache or an identical request in flight.")):
+                lines += ["# HELP {} {}".format(name, description), "# TYPE {} counter".format(name)]
+                for (method, endpoint), stats in items:
+                    lines.append('{}{{method="{}",endpoint="{}"}} {}'
+                                 .format(name, method, endpoint, getattr(stats, attribute)))
+
+            lines += ["# HELP dnacsdk_auth_refreshes_total Auth tokens requested.",
+                      "# TYPE dnacsdk_auth_refreshes_total counter",
+                      "dnacsdk_auth_refreshes_total {}".format(self.auth_refreshes)]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write a node_exporter textfile atomically
+        """
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as textfile:
+            textfile.write(self.to_prometheus())
+        os.replace(tmp_path, path)
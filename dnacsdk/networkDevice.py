@@ -5,18 +5,171 @@ from dnacsdk.networkDevice import NetworkDevice
 dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 
 devices = NetworkDevice.get_all(dnacp)
+device = NetworkDevice.from_info(dnacp, devices[0].info)
+switches = NetworkDevice.resolve_many(dnacp, ["switch1", "10.32.250.6"])
 
+for device in NetworkDevice.iter_all(dnacp, family = "Switches and Hubs"):
+    for interface in device.iter_interfaces():
+        print(device.hostname, interface["portName"])
+
+# Keep only the attributes plus softwareVersion of every device; the full
+# record of a device is fetched again when its info is first read
+devices = NetworkDevice.get_all(dnacp, retain = ("softwareVersion",))
+print(devices[0].field("softwareVersion"), devices[0].info["upTime"])
 
 """
 
-from .exceptions import ResourceNotFound
+import ipaddress
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import util
+from .exceptions import ResourceNotFound, DeviceNotFound, MissingParam
 
 class NetworkDevice(object):
+    # Number of hostnames or IPs sent in a single filtered inventory query
+    RESOLVE_BATCH_SIZE = 50
+    # Records requested per page, the controller caps this at 500
+    PAGE_SIZE = 500
+
+    # Record fields kept as attributes of every device
+    FIELDS = ("id", "hostname", "managementIpAddress", "serialNumber",
+              "macAddress", "location", "family", "type")
+    # Attributes with few distinct values, shared between devices
+    INTERNED_FIELDS = ("location", "family", "type")
+    # What else of the record a device keeps: True for all of it, or a
+    # tuple of field names, () for none. The rest is fetched on demand.
+    RETAIN = True
+
+    __slots__ = FIELDS + ("dnacp", "_info", "_info_complete",
+                          "_interfaces", "_interfaces_epoch", "__weakref__")
+
+    @classmethod
+    def get_all(cls, dnacp, retain = None):
+        return list(cls.iter_all(dnacp, retain = retain))
+
+    @classmethod
+    def iter_all(cls, dnacp, page_size = None, retain = None, **filters):
+        """Yield every device, one page at a time. Keyword arguments are
+        passed to the controller as query filters, e.g. family="Routers".
+        retain overrides RETAIN for these devices.
+        """
+        for record in cls.iter_records(dnacp, page_size, **filters):
+            yield cls.from_info(dnacp, record, retain)
+
+    @classmethod
+    def iter_records(cls, dnacp, page_size = None, **filters):
+        """Yield raw device records from /api/v1/network-device, paging
+        with offset/limit (offset is 1-based).
+        """
+        page_size = page_size or cls.PAGE_SIZE
+        offset = 1
+        while True:
+            count = 0
+            for record in cls.__page__(dnacp, cls.__records_url__(offset, page_size, filters)):
+                count += 1
+                yield record
+            if count < page_size:
+                return
+            offset += count
+
+    @classmethod
+    def iter_interface_records(cls, dnacp, deviceId, page_size = None):
+        """Yield the interface records of a device, one page at a time.
+        Yields nothing if the device has no interfaces.
+        """
+        page_size = page_size or cls.PAGE_SIZE
+        start = 1
+        while True:
+            try:
+                page = cls.__page__(dnacp, cls.__interfaces_url__(deviceId, start, page_size))
+            except ResourceNotFound:
+                return
+            count = 0
+            for record in page:
+                count += 1
+                yield record
+            if count < page_size:
+                return
+            start += count
+
+    @staticmethod
+    def __page__(dnacp, url):
+        """Records of one page, parsed as they arrive when the Api can stream
+        """
+        get_items = getattr(dnacp, "get_items", None)
+        if get_items is not None:
+            return get_items(url)
+        return dnacp.get(url)["response"]
+
+    @staticmethod
+    def __records_url__(offset, page_size, filters):
+        params = util.merge_dict(filters, {"offset": offset, "limit": page_size})
+        return util.join_url_params("/api/v1/network-device", params)
+
+    @staticmethod
+    def __interfaces_url__(deviceId, start, page_size):
+        return "/api/v1/interface/network-device/{}/{}/{}".format(deviceId, start, page_size)
+
+    @classmethod
+    def from_info(cls, dnacp, info, retain = None):
+        """Build a NetworkDevice from an already fetched device record
+        without making another request. retain overrides RETAIN.
+        """
+        device = cls.__new__(cls)
+        device.__load__(dnacp, info, retain)
+        return device
+
+    @classmethod
+    def resolve_many(cls, dnacp, keys, ignore_missing = False, retain = None):
+        """Resolve hostnames and/or management IPs to devices in batched,
+        server side filtered queries.
+
+        Returns a dict of key to NetworkDevice in the order given. Raises
+        DeviceNotFound listing every unmatched key unless ignore_missing.
+        """
+        keys = list(dict.fromkeys(keys))
+        hostnames = [key for key in keys if not cls.__is_ip__(key)]
+        addresses = [key for key in keys if cls.__is_ip__(key)]
+
+        found = {}
+        for field, values in (("hostname", hostnames),
+                              ("managementIpAddress", addresses)):
+            for record in cls.__filter__(dnacp, field, values):
+                found[record[field]] = record
+
+        missing = [key for key in keys if key not in found]
+        if missing and not ignore_missing:
+            raise DeviceNotFound(missing)
+
+        return dict((key, cls.from_info(dnacp, found[key], retain))
+                    for key in keys if key in found)
+
     @classmethod
-    def get_all(cls, dnacp):
-        devices = dnacp.get("/api/v1/network-device")["response"]
-        devices = [NetworkDevice(dnacp, deviceId = device["id"]) for device in devices]
-        return devices
+    def __filter__(cls, dnacp, field, values):
+        """Query /api/v1/network-device filtered on field, batching values.
+        The controller may match partially, so only exact matches are kept.
+        """
+        wanted = set(values)
+        for api in cls.__filter_urls__(field, values):
+            for record in dnacp.get(api)["response"]:
+                if record.get(field) in wanted:
+                    yield record
+
+    @classmethod
+    def __filter_urls__(cls, field, values):
+        return [util.join_url_params("/api/v1/network-device",
+                                     {field: values[start:start + cls.RESOLVE_BATCH_SIZE]})
+                for start in range(0, len(values), cls.RESOLVE_BATCH_SIZE)]
+
+    @staticmethod
+    def __is_ip__(value):
+        try:
+            ipaddress.ip_address(value)
+            return True
+        except ValueError:
+            return False
 
     def __init__(self, dnacp,
         deviceId = None,
@@ -33,52 +186,121 @@ class NetworkDevice(object):
         elif not managementIpAddress is None:
             api = "/api/v1/network-device/ip-address/{}".format(managementIpAddress)
         elif not hostname is None:
-            all_devices = NetworkDevice.get_all(dnacp)
-            for device in all_devices:
-                if hostname == device.hostname:
-                    api = "/api/v1/network-device/{}".format(device.id)
-                    break
+            devices = list(NetworkDevice.__filter__(dnacp, "hostname", [hostname]))
+            if not devices:
+                raise DeviceNotFound([hostname])
+            self.__load__(dnacp, devices[0])
+            return
+        else:
+            raise MissingParam("One of deviceId, serialNumber, "
+                               "managementIpAddress or hostname is required.")
 
         device = dnacp.get(api)["response"]
 
-        self.id = device["id"]
-        self.hostname = device["hostname"]
-        self.managementIpAddress = device["managementIpAddress"]
-        self.serialNumber = device["serialNumber"]
-        self.macAddress = device["macAddress"]
-        self.location = device["location"]
-        self.family = device["family"]
-        self.type = device["type"]
+        self.__load__(dnacp, device)
+
+    def __load__(self, dnacp, device, retain = None):
+        for field in self.FIELDS:
+            value = device[field]
+            if field in self.INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
 
-        self.info = device
+        retain = self.RETAIN if retain is None else retain
+        if retain is True:
+            self._info = device
+            self._info_complete = True
+        else:
+            self._info = dict((field, device[field]) for field in retain if field in device) or None
+            self._info_complete = False
 
         self.dnacp = dnacp
 
-        # self.interfaces = {}
-        #
-        # try:
-        #     interfaces_api = "/api/v1/interface/network-device/{}".format(self.id)
-        #     interfaces = dnacp.get(interfaces_api)["response"]
-        #     for interface in interfaces:
-        #         self.interfaces[interface["portName"]] = interface
-        # except ResourceNotFound:
-        #     pass
-        # except:
-        #     pass
+        self._interfaces = None
+        self._interfaces_epoch = None
+
+    @property
+    def info(self):
+        """The full device record. Devices built retaining only some fields
+        fetch it on first use.
+        """
+        if not self._info_complete:
+            self._info = self.dnacp.get("/api/v1/network-device/{}".format(self.id))["response"]
+            self._info_complete = True
+        return self._info
+
+    def field(self, name, default = None):
+        """A record field, read from the attributes or retained fields when
+        possible and from the full record otherwise.
+        """
+        if name in self.FIELDS:
+            return getattr(self, name)
+        if self._info is not None and name in self._info:
+            return self._info[name]
+        if self._info_complete:
+            return default
+        return self.info.get(name, default)
+
+    @classmethod
+    def iter_interfaces_many(cls, devices, max_workers = 8, fetch = None):
+        """Fetch the interface tables of many devices through a bounded
+        thread pool. Yields (device, interfaces) as each table completes.
+
+        fetch(device) returns the interface records of one device and
+        defaults to reading every page from the controller.
+        """
+        if fetch is None:
+            fetch = lambda device: list(device.iter_interfaces())
+
+        with ThreadPoolExecutor(max_workers = max_workers) as executor:
+            futures = dict((executor.submit(fetch, device), device) for device in devices)
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def iter_interfaces(self, page_size = None):
+        return NetworkDevice.iter_interface_records(self.dnacp, self.id, page_size)
 
     @property
     def interfaces(self):
-        interfaces_property = {}
+        """Dict of portName to interface record, fetched once and memoized.
 
-        try:
-            interfaces_api = "/api/v1/interface/network-device/{}".format(self.id)
-            interfaces = self.dnacp.get(interfaces_api)["response"]
-            for interface in interfaces:
+        The table is also kept in the Api's shared interface_cache when one
+        is configured. Both are dropped when a template is deployed to this
+        device through the same Api; use refresh() to force a live read.
+        """
+        epoch = self.__epoch__()
+        if self._interfaces is not None and self._interfaces_epoch == epoch:
+            return self._interfaces
+
+        shared = getattr(self.dnacp, "interface_cache", None)
+        interfaces_property = shared.get(self.managementIpAddress) if shared is not None else None
+        if interfaces_property is None:
+            interfaces_property = {}
+            for interface in self.iter_interfaces():
                 interfaces_property[interface["portName"]] = interface
-        except ResourceNotFound:
-            print("No Interfaces")
-            pass
-        except:
-            pass
+            if not interfaces_property:
+                logging.info("No Interfaces on %s", self.hostname)
+            if shared is not None:
+                shared.set(self.managementIpAddress, interfaces_property)
 
+        self._interfaces = interfaces_property
+        self._interfaces_epoch = epoch
         return interfaces_property
+
+    def invalidate(self):
+        """Drop memoized interface data, here and in the shared cache
+        """
+        self._interfaces = None
+        shared = getattr(self.dnacp, "interface_cache", None)
+        if shared is not None:
+            shared.pop(self.managementIpAddress)
+
+    def refresh(self):
+        """Re-read the interfaces from the controller
+        """
+        self.invalidate()
+        return self.interfaces
+
+    def __epoch__(self):
+        device_epoch = getattr(self.dnacp, "device_epoch", None)
+        return device_epoch(self.managementIpAddress) if device_epoch is not None else 0
@@ -0,0 +1,116 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.rateLimit import RateLimiter
+
+# Requests per second per endpoint class, optionally with a burst size
+limiter = RateLimiter({"inventory": 10, "template-programmer": (2, 5)})
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            rate_limiter=limiter)
+
+# The same limits from a string, as read from DNAC_RATE_LIMITS by onboard.py
+limiter = RateLimiter.from_string("inventory=10,template-programmer=2:5")
+"""
+
+import threading
+import time
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+# URL path prefixes of each endpoint class, first match wins
+ENDPOINT_CLASSES = (
+    ("/api/system/v1/auth", "auth"),
+    ("/api/v1/template-programmer", "template-programmer"),
+    ("/api/v1/network-device", "inventory"),
+    ("/api/v1/interface", "inventory"),
+)
+
+
+def endpoint_class(url):
+    path = urlparse(url).path
+    for prefix, name in ENDPOINT_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return "default"
+
+
+class TokenBucket(object):
+    """Thread safe token bucket allowing `rate` requests per second with
+    bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate, burst = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.time()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent
+        """
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.paused_until > now:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller for the given time, e.g. after a 429 response
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.tokens = 0
+
+
+class RateLimiter(object):
+    """One token bucket per endpoint class. Classes without a limit (and
+    "default" unless given) are not limited.
+    """
+
+    def __init__(self, limits):
+        """
+            limits -- dict of endpoint class to requests per second, or to a (rate, burst) tuple
+        """
+        self.buckets = {}
+        for name, limit in limits.items():
+            rate, burst = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            self.buckets[name] = TokenBucket(rate, burst)
+
+    @classmethod
+    def from_string(cls, spec):
+        """Parse "class=rate[:burst],..." e.g. "inventory=10,template-programmer=2:5"
+        """
+        limits = {}
+        for item in spec.split(","):
+            if not item.strip():
+                continue
+            name, limit = item.split("=", 1)
+            rate, _, burst = limit.partition(":")
+            limits[name.strip()] = (float(rate), float(burst) if burst else None)
+        return cls(limits)
+
+    def bucket(self, url):
+        return self.buckets.get(endpoint_class(url), self.buckets.get("default"))
+
+    def acquire(self, url):
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    def pause(self, url, seconds):
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.pause(seconds)
@@ -10,6 +10,10 @@ dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 templates = Template.get_all(dnacp)
 template = Template(dnacp, name = sample_template_name)
 
+catalog = TemplateCatalog(dnacp)
+template = catalog.get(sample_template_name)
+catalog.prefetch(catalog.templates())
+
 deploy_params = {
         "INTERFACE": "GigabitEthernet1/1/3",
         "INTERFACE_DESCRIPTION": "TEST FROM API",
@@ -17,22 +21,105 @@ deploy_params = {
     }
 
 deployment = template.deploy(dnacp, sample_target_device, deploy_params)
+
+results = template.deploy_many(dnacp, [
+        ("10.32.250.6", deploy_params),
+        ("10.32.250.7", deploy_params),
+    ])
+
+# Only deploy to ports whose VLAN or description differ from the parameters
+results = template.deploy_many(dnacp, targets, diff = True)
+skipped = [result for result in results if result["skipped"]]
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .exceptions import ConnectionError
+from .networkDevice import NetworkDevice
+
+
+class TemplateCatalog(object):
+    """Name index over the templates available on DNA Center, built from a
+    single list call. Templates handed out load their details lazily.
+    """
+
+    def __init__(self, dnacp, summaries = None, template_class = None):
+        """
+            summaries -- an already fetched template list, skipping the list call
+            template_class -- class of the templates handed out (default Template)
+        """
+        self.dnacp = dnacp
+        self.template_class = template_class or Template
+        if summaries is None:
+            summaries = dnacp.get("/api/v1/template-programmer/template")
+        self.summaries = summaries
+        self.index = dict((summary["name"], summary["templateId"])
+                          for summary in self.summaries)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.summaries)
+
+    def get_id(self, name):
+        return self.index.get(name)
+
+    def get(self, name):
+        templateId = self.get_id(name)
+        if templateId is None:
+            raise KeyError("Template {} not found.".format(name))
+        return self.template_class(self.dnacp, templateId = templateId, name = name)
+
+    def templates(self, names = None):
+        """Lazy Template objects for every template, or only the named ones.
+        """
+        if names is None:
+            return [self.template_class(self.dnacp, templateId = summary["templateId"],
+                                        name = summary["name"])
+                    for summary in self.summaries]
+        return [self.get(name) for name in names]
+
+    def prefetch(self, templates, max_workers = 8, versions = False):
+        """Load template bodies (and optionally versions) concurrently.
+        """
+        templates = list(templates)
+        if not templates:
+            return templates
+        # Authenticate once up front rather than from every worker.
+        self.dnacp.get_token()
+        with ThreadPoolExecutor(max_workers = max_workers) as executor:
+            list(executor.map(lambda template: template.info, templates))
+            if versions:
+                list(executor.map(lambda template: template.versions, templates))
+        return templates
+
 
 class Template(object):
+    # Most targets packed into a single deploy request
+    DEPLOY_BATCH_SIZE = 100
+
+    # Diff mode: template parameter compared with each interface record field,
+    # and the parameter naming the interface. Names match case-insensitively.
+    DIFF_FIELDS = {
+        "VLAN": "vlanId",
+        "INTERFACE_DESCRIPTION": "description",
+        "DESCRIPTION": "description",
+        "ADMIN_STATUS": "adminStatus",
+    }
+    DIFF_INTERFACE_PARAM = "INTERFACE"
+    # Interface fields whose values compare case-insensitively
+    DIFF_CASE_INSENSITIVE = ("adminStatus", "status")
 
     @classmethod
     def get_all(cls, dnacp):
-        templates = dnacp.get("/api/v1/template-programmer/template")
-        return [Template(dnacp, templateId = template["templateId"]) for template in templates]
+        return TemplateCatalog(dnacp).templates()
 
     @classmethod
     def __get_id__(cls, name, dnacp):
-        templates = cls.get_all(dnacp)
-        for template in templates:
-            if name == template.name:
-                return template.id
+        return TemplateCatalog(dnacp).get_id(name)
 
 
     def __init__(self, dnacp, templateId = None, name = None):
@@ -40,41 +127,245 @@ class Template(object):
             pass
         elif not name is None:
             templateId = Template.__get_id__(name = name, dnacp = dnacp)
+            if templateId is None:
+                raise KeyError("Template {} not found.".format(name))
+
+        self.dnacp = dnacp
+        self.id = templateId
+        self._name = name
+        self._info = None
+        self._versions = None
 
-        template = dnacp.get("/api/v1/template-programmer/template/{}"
-            .format(templateId))
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = self.dnacp.get("/api/v1/template-programmer/template/{}"
+                .format(self.id))
+        return self._info
 
-        self.info = template
-        self.id = self.info["id"]
-        self.name = self.info["name"]
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = self.info["name"]
+        return self._name
 
-        self.versions = dnacp.get("/api/v1/template-programmer/template/version/{}"
-            .format(templateId))[0]["versionsInfo"]
-        self.latest_version = self.versions[1]
-        self.input_params = [param["parameterName"] for param in self.info["templateParams"] ]
+    @property
+    def versions(self):
+        if self._versions is None:
+            self._versions = self.dnacp.get("/api/v1/template-programmer/template/version/{}"
+                .format(self.id))[0]["versionsInfo"]
+        return self._versions
 
-    def deploy(self, dnacp, target_device_ip, params):
+    @property
+    def latest_version(self):
+        return self.versions[1]
 
+    @property
+    def input_params(self):
+        return [param["parameterName"] for param in self.info["templateParams"] ]
+
+    def deploy(self, dnacp, target_device_ip, params, diff = False, **diff_options):
+        """Deploy to one target, returning the deploymentId. With diff, nothing
+        is sent and None is returned when the target interface already matches
+        the parameters (see diff_targets for the diff_options).
+        """
         if not self.__deploy_param_check__(params):
             raise ValueError("Provided deploy parameters invalid.")
 
-        body = {
+        if diff and not self.diff_targets(dnacp, [(target_device_ip, params)], **diff_options)[0]:
+            return None
+
+        try:
+            deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
+                    self.__deploy_body__([(target_device_ip, params)])
+                )
+        finally:
+            self.__devices_changed__(dnacp, [target_device_ip])
+
+        return deployment["deploymentId"]
+
+    def deploy_many(self, dnacp, targets, batch_size = None, diff = False, **diff_options):
+        """Deploy to many (target_device_ip, params) pairs in as few deploy
+        requests as possible. Every pair is validated before anything is sent.
+
+        A device appears at most once per request, so several ports on one
+        device are spread over consecutive requests. Returns one result dict
+        per target, in order, with target, deploymentId, error and skipped
+        keys. With diff, targets whose interface already matches the
+        parameters are skipped (see diff_targets for the diff_options).
+        """
+        targets = list(targets)
+        if not diff:
+            return self.__deploy_targets__(dnacp, targets, batch_size)
+
+        self.__validate_targets__(targets)
+        changes = self.diff_targets(dnacp, targets, **diff_options)
+        deployed = iter(self.__deploy_targets__(
+            dnacp, [target for target, changed in zip(targets, changes) if changed], batch_size))
+        return [next(deployed) if changed else
+                {"target": target, "deploymentId": None, "error": None, "skipped": True}
+                for (target, params), changed in zip(targets, changes)]
+
+    def diff_targets(self, dnacp, targets, devices = None, fetch = None, field_map = None,
+                     interface_param = None, expected = None, max_workers = 8):
+        """For each (target_device_ip, params) pair, whether deploying it
+        would change the device.
+
+        A pair is unchanged only when every parameter besides the interface is
+        mapped to an interface field, and the interface record of that device
+        and port already holds each value (and the expected ones). Anything
+        that cannot be compared, e.g. an unknown device or port, counts as a
+        change.
+
+            devices -- dict of management IP to NetworkDevice, saves resolving the targets
+            fetch -- fetch(device) returning its interface records (default from NetworkDevice.interfaces)
+            field_map -- dict of template parameter to interface field (default DIFF_FIELDS)
+            interface_param -- parameter naming the interface (default DIFF_INTERFACE_PARAM)
+            expected -- dict of interface field to value every target must also have, e.g. {"adminStatus": "UP"}
+        """
+        targets = list(targets)
+        wanted = [self.__diff_fields__(params, field_map, interface_param, expected)
+                  for target, params in targets]
+
+        addresses = list(dict.fromkeys(target for (target, params), fields in zip(targets, wanted)
+                                       if fields is not None))
+        devices = dict(devices or {})
+        missing = [address for address in addresses if address not in devices]
+        if missing:
+            devices.update(NetworkDevice.resolve_many(dnacp, missing, ignore_missing = True))
+
+        if fetch is None:
+            fetch = lambda device: device.interfaces.values()
+        tables = {}
+        selected = [devices[address] for address in addresses if address in devices]
+        if selected:
+            # Authenticate once before the worker threads start
+            dnacp.get_token()
+            results = NetworkDevice.iter_interfaces_many(selected, max_workers = max_workers,
+                                                         fetch = lambda device: list(fetch(device)))
+            for device, interfaces in results:
+                tables[device.managementIpAddress] = dict(
+                    (str(interface.get("portName")).lower(), interface) for interface in interfaces)
+
+        return [fields is None or self.__differs__(tables.get(target, {}).get(fields[0]), fields[1])
+                for (target, params), fields in zip(targets, wanted)]
+
+    def __diff_fields__(self, params, field_map = None, interface_param = None, expected = None):
+        """(lowercased port name, dict of field to wanted value), or None when
+        the parameters cannot be compared with an interface record.
+        """
+        field_map = dict((name.lower(), field)
+                         for name, field in (field_map or self.DIFF_FIELDS).items())
+        interface_param = (interface_param or self.DIFF_INTERFACE_PARAM).lower()
+
+        port, fields = None, dict(expected or {})
+        for name, value in params.items():
+            if name.lower() == interface_param:
+                port = str(value).strip().lower()
+            elif name.lower() in field_map:
+                fields[field_map[name.lower()]] = value
+            else:
+                return None
+        if port is None or not fields:
+            return None
+        return port, fields
+
+    def __differs__(self, interface, fields):
+        if interface is None:
+            return True
+        for field, value in fields.items():
+            current = "" if interface.get(field) is None else str(interface.get(field)).strip()
+            value = "" if value is None else str(value).strip()
+            if field in self.DIFF_CASE_INSENSITIVE:
+                current, value = current.lower(), value.lower()
+            if current != value:
+                return True
+        return False
+
+    def __deploy_targets__(self, dnacp, targets, batch_size = None):
+        results = [None] * len(targets)
+        try:
+            for batch in self.__deploy_batches__(targets, batch_size):
+                deploymentId, error = None, None
+                try:
+                    deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
+                            self.__deploy_body__([targets[position] for position in batch.values()])
+                        )
+                    deploymentId, error = self.__deploy_result__(deployment)
+                # A network error or timeout ends only this batch, whose
+                # outcome is unknown since POST is not retried
+                except (ConnectionError, requests.exceptions.RequestException) as exc:
+                    error = str(exc) or type(exc).__name__
+
+                self.__record_results__(results, batch, deploymentId, error)
+        finally:
+            self.__devices_changed__(dnacp, set(target for target, params in targets))
+        return results
+
+    @staticmethod
+    def __devices_changed__(dnacp, target_device_ips):
+        """Expire cached interface data of the deployment targets
+        """
+        device_changed = getattr(dnacp, "device_changed", None)
+        if device_changed is not None:
+            for target_device_ip in target_device_ips:
+                device_changed(target_device_ip)
+
+    def __validate_targets__(self, targets):
+        invalid = [target for target, params in targets
+                   if not self.__deploy_param_check__(params)]
+        if invalid:
+            raise ValueError("Provided deploy parameters invalid for: {}."
+                .format(", ".join(invalid)))
+
+    def __deploy_batches__(self, targets, batch_size = None):
+        """Validate targets and pack them into batches of at most batch_size,
+        each a dict of target to its position, with no target repeated.
+        """
+        self.__validate_targets__(targets)
+
+        batch_size = batch_size or self.DEPLOY_BATCH_SIZE
+        batches = []
+        for position, (target, params) in enumerate(targets):
+            for batch in batches:
+                if len(batch) < batch_size and target not in batch:
+                    break
+            else:
+                batch = {}
+                batches.append(batch)
+            batch[target] = position
+        return batches
+
+    @staticmethod
+    def __deploy_result__(deployment):
+        deploymentId = deployment.get("deploymentId")
+        if deploymentId is None:
+            return None, str(deployment.get("error", deployment))
+        return deploymentId, None
+
+    @staticmethod
+    def __record_results__(results, batch, deploymentId, error):
+        for target, position in batch.items():
+            results[position] = {
+                "target": target,
+                "deploymentId": deploymentId,
+                "error": error,
+                "skipped": False
+            }
+
+    def __deploy_body__(self, targets):
+        return {
           "targetInfo": [
             {
               "id": target_device_ip,
               "type": "MANAGED_DEVICE_IP",
               "params": params
             }
+            for target_device_ip, params in targets
           ],
           "templateId": self.latest_version["id"]
         }
 
-        deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
-                body
-            )
-
-        return deployment["deploymentId"]
-
     @classmethod
     def deployment_status(cls, dnacp, deploymentId):
         api = "/api/v1/template-programmer/template/deploy/status/{}".format(
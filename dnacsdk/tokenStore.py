@@ -0,0 +1,134 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.tokenStore import TokenStore
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            token_store=TokenStore())
+
+# The first run authenticates and caches the token on disk, later runs
+# reuse it until it is close to expiry.
+devices = dnacp.get("/api/v1/network-device")
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows, files are still written with restricted permissions
+    fcntl = None
+
+from . import util
+
+
+class TokenStore(object):
+    """Auth tokens cached on disk, one file per controller and user.
+
+    Files are created with 0600 permissions in a 0700 directory and access
+    is serialised with an exclusive lock, so concurrent CLI invocations
+    share a single authentication.
+    """
+
+    def __init__(self, path = None, refresh_margin = 60, default_lifetime = 3600):
+        """
+            path -- directory holding the tokens (default $DNACSDK_TOKEN_DIR or ~/.cache/dnacsdk/tokens)
+            refresh_margin -- seconds before expiry at which a token is treated as expired
+            default_lifetime -- assumed lifetime in seconds when the token carries no exp claim
+        """
+        if path is None:
+            path = os.environ.get("DNACSDK_TOKEN_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "dnacsdk", "tokens")
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.default_lifetime = default_lifetime
+
+    def __filename__(self, ip, username):
+        key = hashlib.sha256("{}|{}".format(ip, username).encode("utf-8")).hexdigest()
+        return os.path.join(self.path, key)
+
+    def __ensure_dir__(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+
+    @contextlib.contextmanager
+    def locked(self, ip, username):
+        """Hold the exclusive lock for a controller/user pair. Other processes
+        block here while one of them refreshes the token.
+        """
+        self.__ensure_dir__()
+        fd = os.open(self.__filename__(ip, username) + ".lock",
+                     os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def expires_at(self, token):
+        """Expiry of a token as a unix timestamp, read from the JWT exp claim.
+        """
+        claims = util.jwt_claims(token.get("Token"))
+        if "exp" in claims:
+            return float(claims["exp"])
+        return None
+
+    def is_valid(self, entry, now = None):
+        now = time.time() if now is None else now
+        return entry["expires_at"] - self.refresh_margin > now
+
+    def load(self, ip, username):
+        """Return the cached token dict, or None if absent or about to expire.
+        """
+        try:
+            with open(self.__filename__(ip, username)) as token_file:
+                entry = json.load(token_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not self.is_valid(entry):
+            return None
+        return entry["token"]
+
+    def save(self, ip, username, token):
+        self.__ensure_dir__()
+        expires_at = self.expires_at(token)
+        if expires_at is None:
+            expires_at = time.time() + self.default_lifetime
+
+        filename = self.__filename__(ip, username)
+        tmp_filename = "{}.{}.tmp".format(filename, os.getpid())
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as token_file:
+            json.dump({"token": token, "expires_at": expires_at}, token_file)
+        os.replace(tmp_filename, filename)
+
+    def clear(self, ip, username, rejected = None):
+        """Remove the cached token. Given the token string a controller
+        rejected, a newer token saved by another process is kept.
+        """
+        filename = self.__filename__(ip, username)
+        if rejected is None:
+            self.__remove__(filename)
+            return
+
+        with self.locked(ip, username):
+            try:
+                with open(filename) as token_file:
+                    entry = json.load(token_file)
+            except (IOError, OSError, ValueError):
+                return
+            if entry["token"].get("Token") == rejected:
+                self.__remove__(filename)
+
+    @staticmethod
+    def __remove__(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
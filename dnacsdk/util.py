@@ -1,3 +1,5 @@
+import base64
+import json
 import re
 
 try:
@@ -24,8 +26,10 @@ def join_url_params(url, params):
     Usage::
         >>> util.join_url_params("example.com/index.html", {"page-id": 2, "Company": "Pay Pal"})
         example.com/index.html?page-id=2&Company=Pay+Pal
+        >>> util.join_url_params("example.com/index.html", {"hostname": ["sw1", "sw2"]})
+        example.com/index.html?hostname=sw1&hostname=sw2
     """
-    return url + "?" + urlencode(params)
+    return url + "?" + urlencode(params, doseq=True)
 
 
 def merge_dict(data, *override):
@@ -38,4 +42,18 @@ def merge_dict(data, *override):
     result = {}
     for current_dict in (data,) + override:
         result.update(current_dict)
-    return result
\ No newline at end of file
+    return result
+
+def jwt_claims(token):
+    """Decodes the claims of a JWT without verifying its signature.
+    Returns an empty dict if the token is not a JWT.
+    Usage::
+        >>> util.jwt_claims(token)["exp"]
+        1539812345
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload.encode("ascii")).decode("utf-8"))
+    except (AttributeError, IndexError, ValueError):
+        return {}
@@ -16,39 +16,341 @@ or implied.
 """
 
 import os
-from dnacsdk.api import Api
-import urllib3
+import sys
+import json
+import hashlib
+import threading
+import traceback
 import click
-import tabulate
 
 __author__ = "Hank Preston <hapresto@cisco.com>"
 __copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
 __license__ = "Cisco Sample Code License, Version 1.0"
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
 DNAC_IP = os.environ.get("DNAC_IP")
 DNAC_USERNAME = os.environ.get("DNAC_USERNAME")
 DNAC_PASSWORD = os.environ.get("DNAC_PASSWORD")
+# Set DNAC_SCHEME=http to talk to a local stand-in controller
+DNAC_SCHEME = os.environ.get("DNAC_SCHEME", "https")
+# Optional client side limits, e.g. DNAC_RATE_LIMITS="inventory=10,template-programmer=2:5"
+DNAC_RATE_LIMITS = os.environ.get("DNAC_RATE_LIMITS")
+# Set DNAC_TOKEN_CACHE=off to authenticate on every invocation
+DNAC_TOKEN_CACHE = os.environ.get("DNAC_TOKEN_CACHE", "on").lower() not in ("0", "off", "false", "no")
+# Seconds GET responses are reused, e.g. DNAC_RESPONSE_CACHE=30; off by default
+DNAC_RESPONSE_CACHE = float(os.environ.get("DNAC_RESPONSE_CACHE") or 0)
+# Several controllers used as one instead of DNAC_IP, e.g.
+# DNAC_CLUSTERS="emea=10.10.22.74,apac=10.20.22.74", sharing DNAC_USERNAME and DNAC_PASSWORD
+DNAC_CLUSTERS = os.environ.get("DNAC_CLUSTERS")
+# Set DNAC_DAEMON=off to run commands here even when `onboard.py serve` is running
+DNAC_DAEMON = os.environ.get("DNAC_DAEMON", "on").lower() not in ("0", "off", "false", "no")
+
+# Seconds the template list is reused before it is fetched again, which
+# only matters in the long running `serve` process
+CATALOG_TTL = 60
+
+# The Api, built by get_api() when a command first needs DNA Center
+dnacp = None
+# The Cluster over DNAC_CLUSTERS, built by get_cluster()
+cluster = None
+
+def check_settings():
+    if (DNAC_IP is None and DNAC_CLUSTERS is None) or DNAC_USERNAME is None or DNAC_PASSWORD is None:
+        print("DNA Center details must be set via environment variables before running.")
+        print("   export DNAC_IP=192.168.100.1")
+        print("   export DNAC_USERNAME=admin")
+        print("   export DNAC_PASSWORD=password")
+        print("or, for several DNA Center clusters, instead of DNAC_IP")
+        print("   export DNAC_CLUSTERS=emea=192.168.100.1,apac=192.168.200.1")
+        print("")
+        sys.exit("1")
+
+def get_api():
+    """The shared Api, created on first use so --help and local commands do
+    not pay for importing requests or checking the DNA Center settings.
+    """
+    global dnacp
+    if dnacp is not None:
+        return dnacp
+
+    check_settings()
+    if DNAC_IP is None:
+        raise click.UsageError("This command needs DNAC_IP.")
+    dnacp = new_api(DNAC_IP)
+    return dnacp
+
+def get_cluster():
+    """The Cluster over DNAC_CLUSTERS, or None when DNAC_CLUSTERS is not set.
+    """
+    global cluster
+    if cluster is not None or DNAC_CLUSTERS is None:
+        return cluster
+
+    check_settings()
+    from dnacsdk.cluster import Cluster
+    try:
+        cluster = Cluster.from_string(DNAC_CLUSTERS, new_api, catalog_ttl = CATALOG_TTL)
+    except ValueError as error:
+        raise click.UsageError("DNAC_CLUSTERS: {}".format(error))
+    return cluster
+
+def all_apis():
+    """The Api of every controller in use
+    """
+    if DNAC_CLUSTERS is not None:
+        return [api for name, api in get_cluster()]
+    return [get_api()]
+
+def new_api(ip):
+    import urllib3
+    from dnacsdk.api import Api
+    from dnacsdk.tokenStore import TokenStore
+    from dnacsdk.rateLimit import RateLimiter
+    from dnacsdk.cache import ResponseCache
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    return Api(ip=ip, username=DNAC_USERNAME, password=DNAC_PASSWORD, scheme=DNAC_SCHEME,
+               token_store=TokenStore() if DNAC_TOKEN_CACHE else None,
+               rate_limiter=RateLimiter.from_string(DNAC_RATE_LIMITS) if DNAC_RATE_LIMITS else None,
+               response_cache=ResponseCache(ttl=DNAC_RESPONSE_CACHE) if DNAC_RESPONSE_CACHE > 0 else None)
+
+# Template list and inventory indexes kept across the commands of a `serve` process
+warm = {"catalog": None, "catalog_at": 0, "indexes": {}}
+
+def template_catalog():
+    """The template name index, reloaded once it is CATALOG_TTL seconds old
+    or the Api is replaced.
+    """
+    import time
+    from dnacsdk.templateProgrammer import TemplateCatalog
+
+    catalog = warm["catalog"]
+    if catalog is None or catalog.dnacp is not get_api() or time.time() - warm["catalog_at"] > CATALOG_TTL:
+        warm["catalog"] = TemplateCatalog(get_api())
+        warm["catalog_at"] = time.time()
+    return warm["catalog"]
+
+def catalog_for(dnacp):
+    """The template catalog of the controller behind dnacp, e.g. device.dnacp
+    """
+    cluster = get_cluster()
+    if cluster is None:
+        return template_catalog()
+    return cluster.catalog(cluster.owner(dnacp))
 
-if DNAC_IP is None or DNAC_USERNAME is None or DNAC_PASSWORD is None:
-    print("DNA Center details must be set via environment variables before running.")
-    print("   export DNAC_IP=192.168.100.1")
-    print("   export DNAC_USERNAME=admin")
-    print("   export DNAC_PASSWORD=password")
-    print("")
-    exit("1")
+def open_index():
+    from dnacsdk.inventoryIndex import InventoryIndex
 
-dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+    path = InventoryIndex.default_path(DNAC_IP)
+    if path not in warm["indexes"]:
+        warm["indexes"][path] = InventoryIndex(path)
+    return warm["indexes"][path]
 
 @click.group()
-def cli():
+@click.option("--index", "use_index", is_flag=True, envvar="DNAC_INDEX",
+              help="Answer device and interface lookups from the local inventory index.")
+@click.option("--live", is_flag=True,
+              help="Force a live read from DNA Center (refreshes the index when enabled).")
+@click.option("--stats", type=click.Choice(["summary", "json", "prometheus"]),
+              help="Report per endpoint request counts, latencies and bytes once the command finishes.")
+@click.option("--stats-file", type=click.Path(dir_okay=False),
+              help="Write the --stats report to this file instead of stderr, "
+                   "e.g. a node_exporter textfile for --stats prometheus.")
+@click.pass_context
+def cli(ctx, use_index, live, stats, stats_file):
     """Command line tool for deploying templates to DNA Center.
     """
-    pass
+    if use_index and DNAC_CLUSTERS is not None:
+        raise click.UsageError("--index is only available with DNAC_IP, not DNAC_CLUSTERS.")
+    ctx.obj = {"index": open_index() if use_index else None, "live": live}
+
+    if stats is not None:
+        from dnacsdk.metrics import Metrics
+        metrics = Metrics()
+        for api in all_apis():
+            api.add_hook(metrics)
+        ctx.call_on_close(lambda: report_stats(metrics, stats, stats_file))
+
+def report_stats(metrics, format, path):
+    """Print or write the request metrics collected during the command.
+    """
+    for api in all_apis():
+        api.remove_hook(metrics)
+    if format == "prometheus" and path:
+        metrics.write_prometheus(path)
+        return
+    report = {"summary": metrics.summary, "json": metrics.to_json,
+              "prometheus": metrics.to_prometheus}[format]()
+    if path:
+        with open(path, "w") as output:
+            output.write(report + "\n")
+    else:
+        click.echo(report, err=True)
+
+def inventory_index():
+    """The local inventory index, synced with DNA Center, or None if disabled.
+    """
+    options = click.get_current_context().obj
+    index = options["index"]
+    if index is not None:
+        index.sync_devices(get_api(), force = options["live"])
+    return index
+
+def find_device(key):
+    """The NetworkDevice of a hostname or management IP, like find_devices
+    """
+    device = find_devices([key]).get(key)
+    if device is None:
+        raise click.ClickException("Device not found: {}".format(key))
+    return device
+
+def find_devices(keys):
+    """Dict of hostname or IP to NetworkDevice, leaving out unknown keys.
+    """
+    from dnacsdk.networkDevice import NetworkDevice
+
+    cluster = get_cluster()
+    if cluster is not None:
+        return cluster.resolve_many(keys, ignore_missing = True)
+    dnacp = get_api()
+    devices = {}
+    index = inventory_index()
+    if index is not None:
+        for key in keys:
+            info = index.find_device(key)
+            if info is not None:
+                devices[key] = NetworkDevice.from_info(dnacp, info)
+
+    remaining = [key for key in keys if key not in devices]
+    if remaining:
+        devices.update(NetworkDevice.resolve_many(dnacp, remaining, ignore_missing = True))
+    return devices
+
+def interface_fetcher():
+    """Function returning the interface records of a device, reading from
+    the index when enabled. It can be called from worker threads.
+    """
+    options = click.get_current_context().obj
+    index, live = options["index"], options["live"]
+
+    def fetch(device):
+        if index is None:
+            return list(device.iter_interfaces())
+        if live or index.interfaces_stale(device.id):
+            index.store_interfaces(device.id, list(device.iter_interfaces()))
+        return list(index.interfaces(device.id).values())
+
+    return fetch
+
+def diff_options(command):
+    """--diff and its settings, shared by deploy and deploy_batch.
+    """
+    command = click.option("--diff-expect", multiple=True, metavar="FIELD=VALUE",
+                           help="Interface field value every target must also have, e.g. adminStatus=UP.")(command)
+    command = click.option("--diff-field", multiple=True, metavar="PARAM=FIELD",
+                           help="Compare a template parameter with an interface field "
+                                "(default VLAN=vlanId, INTERFACE_DESCRIPTION=description).")(command)
+    command = click.option("--diff", is_flag=True,
+                           help="Skip targets whose interface already matches the parameters.")(command)
+    return command
+
+def diff_settings(diff_fields, diff_expect):
+    """Keyword arguments of Template.diff_targets from the --diff-* options.
+    """
+    settings = {"fetch": interface_fetcher()}
+    for name, values in (("field_map", diff_fields), ("expected", diff_expect)):
+        pairs = [value.split("=", 1) for value in values]
+        if any(len(pair) != 2 for pair in pairs):
+            raise click.BadParameter("expected NAME=VALUE pairs", param_hint="--diff-*")
+        if pairs:
+            settings[name] = dict(pairs)
+    return settings
+
+OUTPUT_FORMATS = ["table", "ndjson", "csv", "json", "tsv"]
+
+def output_options(command):
+    """--format, shared by the list commands.
+    """
+    return click.option("--format", "output_format", type=click.Choice(OUTPUT_FORMATS),
+                        default="table", show_default=True,
+                        help="table is printed once complete, the other formats row by row.")(command)
+
+def table_format():
+    """fancy_grid when stdout can encode its box drawing characters, else grid,
+    so the table is rendered once.
+    """
+    encoding = getattr(sys.stdout, "encoding", None) or "ascii"
+    try:
+        u"\u2552\u2550\u2564\u2502".encode(encoding)
+        return "fancy_grid"
+    except (UnicodeEncodeError, LookupError):
+        return "grid"
+
+def echo_table(table, headers):
+    import tabulate
+
+    click.echo(tabulate.tabulate(table, headers, tablefmt=table_format()))
+
+class RowWriter(object):
+    """Writes the rows of a list command as they are produced.
+
+    Only the table format holds the rows, to render them once on close().
+    Cells that are lists are kept as lists in json and ndjson and joined
+    into one cell otherwise.
+    """
+
+    def __init__(self, output_format, headers, sort_key=None):
+        self.output_format = output_format
+        self.headers = headers
+        self.sort_key = sort_key
+        self.table = list()
+        self.count = 0
+        if output_format == "csv":
+            import csv
+            import io
+            self.buffer = io.StringIO()
+            self.csv = csv.writer(self.buffer, lineterminator="\n")
+            self.echo_csv(headers)
+        elif output_format == "json":
+            click.echo("[", nl=False)
+
+    def write(self, row):
+        if self.output_format == "table":
+            self.table.append([self.cell(value, "\n") for value in row])
+        elif self.output_format == "ndjson":
+            click.echo(json.dumps(dict(zip(self.headers, row))))
+        elif self.output_format == "json":
+            click.echo("{}\n{}".format("," if self.count else "",
+                                       json.dumps(dict(zip(self.headers, row)))), nl=False)
+        elif self.output_format == "csv":
+            self.echo_csv([self.cell(value, ",") for value in row])
+        else:
+            click.echo("\t".join(self.cell(value, ",").replace("\n", " ") for value in row))
+        self.count += 1
+
+    def close(self):
+        if self.output_format == "table":
+            table = sorted(self.table, key=self.sort_key) if self.sort_key else self.table
+            echo_table(table, self.headers)
+        elif self.output_format == "json":
+            click.echo("\n]" if self.count else "]")
+
+    def echo_csv(self, row):
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.csv.writerow(row)
+        click.echo(self.buffer.getvalue(), nl=False)
+
+    @staticmethod
+    def cell(value, separator):
+        if isinstance(value, (list, tuple)):
+            return separator.join(str(item) for item in value)
+        return "" if value is None else str(value)
 
 @click.command()
-def device_list():
+@output_options
+@click.option("--stream", is_flag=True, help="Same as --format tsv.")
+def device_list(output_format, stream):
     """Retrieve and return network devices list.
 
         Returns the hostname, management IP, and family of each device.
@@ -56,84 +358,162 @@ def device_list():
         Example command:
 
             ./onboard.py device_list
+            ./onboard.py device_list --format csv > devices.csv
 
     """
-    click.secho("Retrieving the devices.")
+    if stream:
+        output_format = "tsv"
+    click.secho("Retrieving the devices.", err=output_format != "table")
 
     from dnacsdk.networkDevice import NetworkDevice
-    devices = NetworkDevice.get_all(dnacp)
 
     headers = ["Hostname", "Management IP", "Family"]
-    table = list()
+    cluster = get_cluster()
+    if cluster is not None:
+        # Every controller is read at once
+        rows = RowWriter(output_format, ["Cluster"] + headers)
+        for name, device in cluster.iter_all(retain = ()):
+            rows.write([name, device.hostname, device.managementIpAddress, device.family])
+        rows.close()
+        return
+
+    dnacp = get_api()
+    index = inventory_index()
+    if index is not None:
+        devices = (NetworkDevice.from_info(dnacp, info, retain = ()) for info in index.devices())
+    else:
+        devices = NetworkDevice.iter_all(dnacp, retain = ())
 
+    rows = RowWriter(output_format, headers)
     for device in devices:
-        tr = [device.hostname, device.managementIpAddress, device.family]
-        table.append(tr)
-    try:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
-    except UnicodeEncodeError:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+        rows.write([device.hostname, device.managementIpAddress, device.family])
+    rows.close()
 
 @click.command()
-@click.argument("device")
-def interface_list(device):
-    """Retrieve the list of interfaces on a device.
+@click.argument("devices", nargs=-1)
+@click.option("--family", help='Only devices of this family, e.g. "Switches and Hubs".')
+@click.option("--concurrency", type=int, default=8, show_default=True,
+              help="Interface tables fetched at once.")
+@output_options
+def interface_list(devices, family, concurrency, output_format):
+    """Retrieve the list of interfaces on one or more devices.
 
         Returns the port name, status, description, and vlan information.
+        Give several devices, "all", or --family to audit many devices at
+        once; their interface tables are fetched in parallel.
 
         Example command:
 
             ./onboard.py inteface_list switch1
 
-    """
-    click.secho("Retrieving the interfaces for {}.".format(device))
+            ./onboard.py inteface_list switch1 switch2 switch3
+
+            ./onboard.py inteface_list --family "Switches and Hubs" all
 
+    """
     from dnacsdk.networkDevice import NetworkDevice
-    device = NetworkDevice(dnacp, hostname = device)
 
+    if not devices and family is None:
+        raise click.UsageError("Give one or more devices, \"all\", or --family.")
+    cluster = get_cluster()
+    click.secho("Retrieving the interfaces for {}.".format(
+        ", ".join(devices) or family), err=output_format != "table")
+
+    if cluster is not None and (not devices or "all" in devices):
+        filters = {"family": family} if family is not None else {}
+        selected = [device for name, device in cluster.iter_all(retain = (), **filters)]
+    elif not devices or "all" in devices:
+        dnacp = get_api()
+        index = inventory_index()
+        if index is not None:
+            selected = [NetworkDevice.from_info(dnacp, info, retain = ()) for info in index.devices()]
+        elif family is not None:
+            selected = NetworkDevice.iter_all(dnacp, retain = (), family = family)
+        else:
+            selected = NetworkDevice.iter_all(dnacp, retain = ())
+    else:
+        found = find_devices(list(devices))
+        missing = [device for device in devices if device not in found]
+        if missing:
+            raise click.ClickException("Device(s) not found: {}".format(", ".join(missing)))
+        selected = [found[device] for device in dict.fromkeys(devices)]
+    selected = [device for device in selected if family is None or device.family == family]
+
+    many = len(selected) > 1
     headers = ["Port Name", "Status", "Description", "VLAN", "Voice VLAN"]
-    table = list()
+    if many:
+        headers = ["Device"] + headers
+    rows = RowWriter(output_format, headers, sort_key = (lambda tr: str(tr[0])) if many else None)
 
-    for interface in device.interfaces.values():
-        tr = [
-                interface["portName"],
-                "{}/{}".format(interface["adminStatus"], interface["status"]),
-                interface["description"],
-                interface["vlanId"],
-                interface["voiceVlan"]
-            ]
-        table.append(tr)
-    try:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
-    except UnicodeEncodeError:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+    # Authenticate once before the worker threads start
+    if cluster is not None:
+        cluster.get_token()
+    else:
+        get_api().get_token()
+    results = NetworkDevice.iter_interfaces_many(selected, max_workers = concurrency,
+                                                 fetch = interface_fetcher())
+    for device, interfaces in results:
+        for interface in interfaces:
+            tr = [
+                    interface["portName"],
+                    "{}/{}".format(interface["adminStatus"], interface["status"]),
+                    interface["description"],
+                    interface["vlanId"],
+                    interface["voiceVlan"]
+                ]
+            if many:
+                tr = [device.hostname] + tr
+            rows.write(tr)
+
+    rows.close()
 
 @click.command()
-def template_list():
+@click.argument("names", nargs=-1)
+@output_options
+def template_list(names, output_format):
     """Retrieve the deployment templates that are available.
 
         Returns the template name, parameters, content, and device types.
+        Optionally limit the output to the named templates.
 
         Example command:
 
             ./onboard.py template_list
+
+            ./onboard.py template_list NetworkDeviceOnboarding
+            ./onboard.py template_list --format json
     """
-    click.secho("Retrieving the templates available")
+    click.secho("Retrieving the templates available", err=output_format != "table")
 
-    from dnacsdk.templateProgrammer import Template
-    templates = Template.get_all(dnacp)
+    cluster = get_cluster()
+    # Catalog of each controller, keyed by cluster name (None for DNAC_IP)
+    catalogs = cluster.catalogs() if cluster is not None else {None: template_catalog()}
+    missing = [name for name in names if not any(name in catalog for catalog in catalogs.values())]
+    if missing:
+        raise click.ClickException("Unknown template(s): {}".format(", ".join(missing)))
+
+    def load(dnacp, catalog):
+        return catalog.prefetch(catalog.templates(
+            [name for name in names if name in catalog] if names else None))
+
+    if cluster is not None:
+        # Templates of every controller are loaded at once
+        templates = [(name, template) for name, loaded in cluster.run(
+                        (name, load, (catalog,)) for name, catalog in catalogs.items())
+                     for template in loaded]
+    else:
+        templates = [(None, template) for template in load(get_api(), catalogs[None])]
 
     headers = ["Template Name", "Parameters", "Deploy Command", "Content", "Device Types"]
-    table = list()
+    rows = RowWriter(output_format, headers if cluster is None else ["Cluster"] + headers)
 
-    for template in templates:
-        tr = []
+    for name, template in templates:
+        tr = [] if cluster is None else [name]
         tr.append(template.name)
-        tr.append("\n".join(
+        tr.append(
                 ["{}".format(param["parameterName"])
                     for param in template.info["templateParams"]
                 ]
-            )
         )
         cmd = "./onboard.py deploy \\\n --template {} \\\n --target {} ".format(
                 template.name,
@@ -148,22 +528,21 @@ def template_list():
         cmd = cmd + params_cmd
         tr.append(cmd)
         tr.append(template.info["templateContent"])
-        tr.append("\n".join(
+        tr.append(
             [type["productFamily"] for type in template.info["deviceTypes"]]
-            )
         )
-        table.append(tr)
-    try:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
-    except UnicodeEncodeError:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+        rows.write(tr)
+    rows.close()
 
 
 @click.command()
-@click.option("--template", help="Name of the template to deploy")
-@click.option("--target", help="Hostname of target network device.")
+@click.option("--template", required=True, help="Name of the template to deploy")
+@click.option("--target", required=True, help="Hostname or management IP of target network device.")
+@click.option("--wait", is_flag=True, help="Poll until the deployment finishes.")
+@click.option("--timeout", type=float, default=None, help="Most seconds to wait with --wait.")
+@diff_options
 @click.argument("parameters", nargs=-1)
-def deploy(template, target, parameters):
+def deploy(template, target, wait, timeout, diff, diff_field, diff_expect, parameters):
     """Deploy a template with DNA Center.
 
         Provide all template parameters and their values as arguements in the format of: "PARAMTER=VALUE"
@@ -171,36 +550,498 @@ def deploy(template, target, parameters):
         You can find the list of parameters using:
           ./onboard.py template_list
 
+        With --diff nothing is deployed when the interface already has the
+        requested VLAN and description.
+
         Example command:
 
           ./onboard.py deploy --template VLANSetup --target switch1 \\\n"VLANID=3001" "VLANNAME=Data"
     """
     click.secho("Attempting deployment.")
 
-    from dnacsdk.networkDevice import NetworkDevice
     from dnacsdk.templateProgrammer import Template
 
-
-    device = NetworkDevice(dnacp, hostname = target)
-    template = Template(dnacp, name = template)
+    # With DNAC_CLUSTERS, the controller managing the target
+    device = find_device(target)
+    dnacp = device.dnacp
+    catalog = catalog_for(dnacp)
+    if template not in catalog:
+        raise click.ClickException("Unknown template: {}".format(template))
+    template = catalog.get(template)
 
     deploy_params = dict([param.split("=", maxsplit=1) for param in parameters])
 
+    diff_kwargs = {}
+    if diff:
+        diff_kwargs = diff_settings(diff_field, diff_expect)
+        diff_kwargs["devices"] = {device.managementIpAddress: device}
+
     # Deploy Template
     deployment = template.deploy(
                                     dnacp,
                                     target_device_ip = device.managementIpAddress,
-                                    params = deploy_params
+                                    params = deploy_params,
+                                    diff = diff,
+                                    **diff_kwargs
                                 )
+    if deployment is None:
+        click.secho("Skipped: {} already matches the parameters. 0 deployed, 1 skipped.".format(target))
+        return
+
+    index = click.get_current_context().obj["index"]
+    if index is not None:
+        index.invalidate_interfaces(device.id)
+
+    if wait:
+        wait_for_deployments([(dnacp, [deployment])], timeout)
+        return
 
     print("Deployment Status: {}".format(
         Template.deployment_status(dnacp, deployment)["devices"][0]["status"])
     )
 
+def wait_for_deployments(deployments, timeout = None):
+    """Print each state change of the deployments, given as (dnacp,
+    deploymentIds) pairs, until they finish.
+    """
+    from dnacsdk.deploymentTracker import DeploymentTracker
+
+    tracker = DeploymentTracker(None)
+    for dnacp, deploymentIds in deployments:
+        tracker.track(deploymentIds, dnacp = dnacp)
+    for deploymentId, state, response in tracker.changes(timeout = timeout):
+        click.echo("Deployment {} Status: {}".format(deploymentId, state))
+    if tracker.pending:
+        raise click.ClickException("{} deployment(s) still in progress after {}s."
+            .format(len(tracker.pending), timeout))
+    return tracker.states
+
+@click.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--template", help="Template for rows that do not name one.")
+@click.option("--manifest-format", type=click.Choice(["csv", "yaml", "ndjson"]),
+              help="Manifest format (default: from the file extension).")
+@click.option("--batch-size", type=int, default=None,
+              help="Most targets sent in one deploy request.")
+@click.option("--wait", is_flag=True, help="Poll until all deployments finish.")
+@click.option("--timeout", type=float, default=None, help="Most seconds to wait with --wait.")
+@diff_options
+def deploy_batch(manifest, template, manifest_format, batch_size, wait, timeout,
+                 diff, diff_field, diff_expect):
+    """Deploy templates to many targets listed in a manifest file.
+
+        The manifest (CSV, YAML or NDJSON) has one row per deployment with
+        a target, an optional template and the template parameters. All rows
+        are validated before anything is deployed, and targets sharing a
+        template are sent in as few deploy requests as possible. With --diff,
+        rows whose interface already matches are skipped, so re-running a
+        manifest only deploys what changed.
+
+        Example command:
+
+          ./onboard.py deploy_batch --template NetworkDeviceOnboarding floor3.csv
+    """
+    from dnacsdk.manifest import read_manifest
+
+    try:
+        rows = read_manifest(manifest, default_template = template, format = manifest_format)
+    except (ValueError, KeyError) as error:
+        raise click.ClickException("Invalid manifest: {}".format(error))
+    click.secho("Validating {} manifest rows.".format(len(rows)))
+
+    cluster = get_cluster()
+    devices = find_devices(list(dict.fromkeys(row.target for row in rows if row.target)))
+
+    def controller(row):
+        """Cluster name of the row's target, None with DNAC_IP
+        """
+        if cluster is None:
+            return None
+        return cluster.owner(devices[row.target].dnacp) if row.target in devices else False
+
+    # Templates keyed by (cluster name, template name), from each controller's catalog
+    apis = dict(cluster) if cluster is not None else {None: get_api()}
+    templates = {}
+    for row in rows:
+        key = (controller(row), row.template)
+        if row.template and key[0] is not False and key not in templates:
+            catalog = catalog_for(apis[key[0]])
+            templates[key] = catalog.get(row.template) if row.template in catalog else None
+
+    def load(dnacp, name):
+        catalog_for(dnacp).prefetch([template for (owner, template_name), template in templates.items()
+                                     if owner == name and template is not None], versions = True)
+
+    if cluster is not None:
+        cluster.run((name, load, (name,)) for name in set(owner for owner, template_name in templates))
+    else:
+        load(get_api(), None)
+
+    errors = []
+    for row in rows:
+        template = templates.get((controller(row), row.template))
+        if not row.target:
+            errors.append([row.line, row.target, row.template, "No target given."])
+        elif row.target not in devices:
+            errors.append([row.line, row.target, row.template, "Device not found."])
+        if not row.template:
+            errors.append([row.line, row.target, row.template, "No template given."])
+        elif controller(row) is False:
+            pass
+        elif template is None:
+            errors.append([row.line, row.target, row.template, "Template not found{}.".format(
+                " on " + controller(row) if cluster is not None else "")])
+        elif sorted(template.input_params) != sorted(row.params):
+            errors.append([row.line, row.target, row.template,
+                "Expected parameters: {}".format(", ".join(template.input_params))])
+
+    if errors:
+        echo_table(errors, ["Line", "Target", "Template", "Error"])
+        raise click.ClickException("Manifest has {} invalid row(s), nothing deployed.".format(len(errors)))
+
+    diff_kwargs = {}
+    if diff:
+        diff_kwargs = diff_settings(diff_field, diff_expect)
+        diff_kwargs["devices"] = dict((device.managementIpAddress, device) for device in devices.values())
+
+    def deploy_rows(dnacp, owner):
+        """Deploy the rows of one controller, a template at a time
+        """
+        deployed = []
+        for (template_owner, name), template in sorted(templates.items()):
+            template_rows = [row for row in rows if row.template == name and controller(row) == owner]
+            if template_owner != owner or not template_rows:
+                continue
+            results = template.deploy_many(
+                    dnacp,
+                    [(devices[row.target].managementIpAddress, row.params) for row in template_rows],
+                    batch_size = batch_size,
+                    diff = diff,
+                    **diff_kwargs
+                )
+            deployed += zip(template_rows, results)
+        return deployed
+
+    click.secho("Attempting deployment.")
+    failure = None
+    failures = {}
+    if cluster is not None:
+        from dnacsdk.exceptions import ClusterError
+
+        # Controllers deploy at the same time. One failing does not hide
+        # what the others submitted.
+        try:
+            ran = cluster.run((owner, deploy_rows, (owner,))
+                              for owner in dict.fromkeys(controller(row) for row in rows))
+        except ClusterError as error:
+            failure = error
+            ran, failures = error.results, error.errors
+        deployed = [(owner, row, result) for owner, rows_deployed in ran for row, result in rows_deployed]
+    else:
+        deployed = [(None, row, result) for row, result in deploy_rows(get_api(), None)]
+
+    table = list()
+    for owner, row, result in deployed:
+        status = "SKIPPED" if result["skipped"] else result["error"] or "SUBMITTED"
+        table.append([row.line, row.target, row.template, result["deploymentId"], status]
+                     + ([owner] if cluster is not None else []))
+    for row in rows:
+        if controller(row) in failures:
+            table.append([row.line, row.target, row.template, None,
+                          str(failures[controller(row)]) or "Failed.", controller(row)])
+
+    index = click.get_current_context().obj["index"]
+    if index is not None:
+        for target in set(tr[1] for tr in table if tr[4] != "SKIPPED"):
+            index.invalidate_interfaces(devices[target].id)
+
+    echo_table(sorted(table), ["Line", "Target", "Template", "Deployment", "Result"]
+                              + (["Cluster"] if cluster is not None else []))
+    submitted = len([tr for tr in table if tr[4] == "SUBMITTED"])
+    skipped = len([tr for tr in table if tr[4] == "SKIPPED"])
+    click.secho("{} submitted, {} skipped, {} failed.".format(
+        submitted, skipped, len(table) - submitted - skipped))
+
+    if wait:
+        wait_for_deployments([(apis[owner], [result["deploymentId"] for result_owner, row, result in deployed
+                                             if result_owner == owner and result["deploymentId"] is not None])
+                              for owner in apis], timeout)
+
+    if failure is not None:
+        raise click.ClickException("Deployment failed on {}".format(failure))
+
+def journal_option(command):
+    """--journal, shared by the queue commands.
+    """
+    return click.option("--journal", type=click.Path(dir_okay=False),
+                        help="Job journal (default one per DNAC_IP or DNAC_CLUSTERS "
+                             "under ~/.cache/dnacsdk).")(command)
+
+def open_journal(path):
+    from dnacsdk.jobQueue import JobQueue
+
+    if path is None:
+        check_settings()
+        path = JobQueue.default_path(DNAC_CLUSTERS or DNAC_IP)
+    return JobQueue(path)
+
+def echo_counts(queue):
+    counts = queue.counts()
+    click.secho(", ".join("{} {}".format(count, state) for state, count in counts.items() if count)
+                or "No jobs queued.", err=True)
+
+@click.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--template", help="Template for rows that do not name one.")
+@click.option("--manifest-format", type=click.Choice(["csv", "yaml", "ndjson"]),
+              help="Manifest format (default: from the file extension).")
+@journal_option
+def queue_add(manifest, template, manifest_format, journal):
+    """Add the rows of a manifest to the job journal.
+
+        Rows already in the journal with the same template, target and
+        parameters are left alone, so a manifest can be added again after
+        an interruption. Run the jobs with queue_run.
+
+        Example command:
+
+          ./onboard.py queue_add --template NetworkDeviceOnboarding floor3.csv
+    """
+    from dnacsdk.manifest import read_manifest
+
+    try:
+        rows = read_manifest(manifest, default_template = template, format = manifest_format)
+    except (ValueError, KeyError) as error:
+        raise click.ClickException("Invalid manifest: {}".format(error))
+    invalid = [str(row.line) for row in rows if not row.target or not row.template]
+    if invalid:
+        raise click.ClickException("Rows without a target or template on line(s): {}"
+            .format(", ".join(invalid)))
+
+    queue = open_journal(journal)
+    added = queue.add_many((row.template, row.target, row.params) for row in rows)
+    click.secho("{} job(s) added, {} already queued.".format(added, len(rows) - added))
+    echo_counts(queue)
+
+@click.command()
+@click.option("--max-in-flight", type=int, default=100, show_default=True,
+              help="Most jobs submitted and not yet finished.")
+@click.option("--per-device", type=int, default=1, show_default=True,
+              help="Most jobs submitted and not yet finished on one device.")
+@click.option("--batch-size", type=int, default=None,
+              help="Most targets sent in one deploy request.")
+@click.option("--timeout", type=float, default=None,
+              help="Stop after this many seconds, leaving the rest for the next run.")
+@click.option("--retry-failed", is_flag=True, help="Queue the failed jobs again first.")
+@diff_options
+@journal_option
+def queue_run(max_in_flight, per_device, batch_size, timeout, retry_failed,
+              diff, diff_field, diff_expect, journal):
+    """Deploy the jobs of the journal, a bounded number at a time.
+
+        Jobs are sent as slots free up, and every state change is written
+        to the journal. After a crash or Ctrl-C, running it again follows
+        the deployments already submitted and sends the rest. Jobs caught
+        in the middle of their deploy request are sent again; add --diff to
+        skip those that were applied.
+
+        Example command:
+
+          ./onboard.py queue_run --max-in-flight 50 --per-device 1
+    """
+    from dnacsdk.jobQueue import DeployScheduler
+
+    queue = open_journal(journal)
+    if retry_failed:
+        click.secho("{} failed job(s) queued again.".format(queue.retry_failed()))
+
+    cluster = get_cluster()
+    try:
+        scheduler = DeployScheduler(queue, dnacp = get_api() if cluster is None else None,
+                                    cluster = cluster, max_in_flight = max_in_flight,
+                                    per_device = per_device, batch_size = batch_size, diff = diff,
+                                    diff_options = diff_settings(diff_field, diff_expect) if diff else None)
+    except ValueError as error:
+        raise click.UsageError(str(error))
+
+    index = click.get_current_context().obj["index"]
+    try:
+        for job in scheduler.run(timeout = timeout):
+            if job.state == "submitted" and index is not None:
+                device = index.find_device(job.device)
+                if device is not None:
+                    index.invalidate_interfaces(device["id"])
+            click.echo("Job {} {} {}: {}{}".format(
+                job.id, job.target, job.template, (job.status or job.state).upper(),
+                " ({})".format(job.error) if job.error else ""))
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    finally:
+        echo_counts(queue)
+
+    counts = queue.counts()
+    if counts["pending"] or counts["submitted"]:
+        raise click.ClickException("{} job(s) left for the next queue_run.".format(
+            counts["pending"] + counts["submitted"]))
+
+@click.command()
+@click.option("--state", "states", multiple=True,
+              type=click.Choice(["pending", "submitting", "submitted", "succeeded", "failed", "skipped"]),
+              help="Only jobs in this state, may be repeated.")
+@click.option("--clear", is_flag=True, help="Delete the finished jobs instead of listing them.")
+@output_options
+@journal_option
+def queue_status(states, clear, output_format, journal):
+    """List the jobs of the journal.
+
+        Example command:
+
+          ./onboard.py queue_status --state failed
+    """
+    queue = open_journal(journal)
+    if clear:
+        click.secho("{} finished job(s) deleted.".format(queue.clear()))
+        return
+
+    headers = ["Job", "Target", "Template", "State", "Status", "Deployment", "Error"]
+    rows = RowWriter(output_format, headers)
+    for job in queue.jobs(states or None):
+        rows.write([job.id, job.target, job.template, job.state, job.status,
+                    job.deployment_id, job.error])
+    rows.close()
+    echo_counts(queue)
+
+@click.command()
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False),
+              help="Unix socket to listen on (default $DNACSDK_SOCKET or ~/.cache/dnacsdk/onboard.sock).")
+@click.option("--catalog-ttl", type=float, default=CATALOG_TTL, show_default=True,
+              help="Seconds the template list is reused before it is fetched again.")
+def serve(socket_path, catalog_ttl):
+    """Keep a warm DNA Center client for other onboard.py runs.
+
+        While it runs, onboard.py commands started with the same DNAC_IP (or DNAC_CLUSTERS),
+        DNAC_USERNAME and DNAC_PASSWORD are forwarded to it over a Unix socket and reuse
+        its token, connections, template list and inventory index. Commands
+        run with its environment, so those started with another
+        DNAC_INDEX, DNAC_RESPONSE_CACHE, DNAC_RATE_LIMITS or DNAC_TOKEN_CACHE
+        run locally.
+        Forwarded commands run one at a time. Set DNAC_DAEMON=off to run a
+        command locally anyway.
+
+        Example command:
+
+          ./onboard.py serve &
+    """
+    global CATALOG_TTL
+    import signal
+    from dnacsdk.daemon import CommandServer, default_socket_path
+
+    CATALOG_TTL = catalog_ttl
+    socket_path = socket_path or default_socket_path()
+    try:
+        server = CommandServer(socket_path, run_forwarded, key = daemon_key())
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+
+    cluster = get_cluster()
+    if cluster is not None:
+        cluster.get_token()
+        cluster.catalogs()
+    else:
+        get_api().get_token()
+        template_catalog()
+    click.secho("Serving {} on {}".format(DNAC_CLUSTERS or DNAC_IP, socket_path))
+    # Remove the socket on kill as well as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for api in all_apis():
+            api.close()
+
+# Forwarded commands change the working directory and output streams of
+# the whole process, so they run one at a time
+command_lock = threading.Lock()
+
+def run_forwarded(argv, cwd, stdout, stderr):
+    """Run a command line received by `serve`, returning its exit code.
+    """
+    with command_lock:
+        saved = (os.getcwd(), sys.stdout, sys.stderr)
+        os.chdir(cwd)
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            cli.main(args = argv, prog_name = "onboard.py")
+            return 0
+        except SystemExit as exit:
+            if exit.code is None or isinstance(exit.code, int):
+                return exit.code or 0
+            click.echo(exit.code, err=True)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            os.chdir(saved[0])
+            sys.stdout, sys.stderr = saved[1:]
+
+# Commands never forwarded: serve itself, and queue_run, which would hold
+# the daemon for the whole run
+LOCAL_COMMANDS = ("serve", "queue_run", "queue-run")
+
+# Settings a `serve` process applies to every command it runs. A command
+# started with other values runs locally instead.
+DAEMON_SETTINGS = ("DNAC_INDEX", "DNAC_RESPONSE_CACHE", "DNAC_RATE_LIMITS", "DNAC_TOKEN_CACHE")
+
+def daemon_key():
+    """Identifies what a `serve` process runs commands as. It includes a
+    digest of DNAC_PASSWORD, so only a shell knowing the password can use
+    the daemon's session.
+    """
+    settings = ",".join("{}={}".format(name, os.environ.get(name, "")) for name in DAEMON_SETTINGS)
+    password = hashlib.sha256((DNAC_PASSWORD or "").encode("utf-8")).hexdigest()
+    return "{}://{}|{}|{}|{}".format(DNAC_SCHEME, DNAC_CLUSTERS or DNAC_IP, DNAC_USERNAME, password,
+                                     settings)
+
+def subcommand(argv):
+    """Name of the command in a command line, skipping the group options
+    and their values, or None
+    """
+    takes_value = [name for param in cli.params if not getattr(param, "is_flag", False)
+                   for name in param.opts]
+    args = iter(argv)
+    for arg in args:
+        if arg in takes_value:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+def forward_to_daemon(argv):
+    """Exit code of the command line run by a `serve` process for the same
+    controller and user, or None if it must run here.
+    """
+    if not DNAC_DAEMON or (DNAC_IP is None and DNAC_CLUSTERS is None) or "--help" in argv \
+            or subcommand(argv) in LOCAL_COMMANDS:
+        return None
+    from dnacsdk.daemon import forward, default_socket_path
+    return forward(default_socket_path(), argv, key = daemon_key())
+
 cli.add_command(deploy)
+cli.add_command(deploy_batch)
 cli.add_command(device_list)
 cli.add_command(interface_list)
+cli.add_command(queue_add)
+cli.add_command(queue_run)
+cli.add_command(queue_status)
+cli.add_command(serve)
 cli.add_command(template_list)
 
 if __name__ == '__main__':
-    cli()
+    exit_code = forward_to_daemon(sys.argv[1:])
+    if exit_code is None:
+        cli()
+    sys.exit(exit_code)
@@ -0,0 +1,55 @@
+"""Test case running benchmarks/fakeController.py in a thread
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+
+try:
+    from urllib.request import urlopen, Request
+except ImportError:
+    from urllib2 import urlopen, Request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fakeController
+from dnacsdk.api import Api
+
+
+class ControllerTestCase(unittest.TestCase):
+    """Starts a fake controller with `devices` devices for each test
+    """
+
+    devices = 10
+
+    def setUp(self):
+        self.server = fakeController.FakeController(
+            ("127.0.0.1", 0), fakeController.Fixtures(self.devices, interfaces = 4, templates = 2),
+            status_polls = 0)
+        thread = threading.Thread(target = self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.ip = "127.0.0.1:{}".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def api(self, **options):
+        return Api(ip = self.ip, scheme = "http", username = "admin", password = "admin", **options)
+
+    def fake(self, action, body = None):
+        """POST to a /_fake/ route
+        """
+        request = Request("http://{}/_fake/{}".format(self.ip, action),
+                          data = json.dumps(body or {}).encode("utf-8"))
+        urlopen(request).read()
+
+    def stats(self):
+        """Requests per endpoint since the last reset
+        """
+        return json.loads(urlopen("http://{}/_fake/stats".format(self.ip)).read().decode("utf-8"))
@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+from controller import ControllerTestCase
+from dnacsdk import exceptions
+from dnacsdk.jsonCodec import StdlibCodec
+
+
+class RetryTest(ControllerTestCase):
+
+    def test_retry_after(self):
+        events = []
+        dnacp = self.api(backoff_factor = 0.001, hooks = [events.append], coalesce = False)
+        dnacp.get_token()
+        self.fake("throttle", {"requests": 2, "retry_after": "0.2"})
+
+        device = dnacp.get("/api/v1/network-device/dev-00000001")["response"]
+        self.assertEqual(device["hostname"], "sw00001.lab.local")
+        retries = [event for event in events if event["kind"] == "retry"]
+        self.assertEqual([retry["attempt"] for retry in retries], [1, 2])
+        for retry in retries:
+            self.assertGreaterEqual(retry["delay"], 0.2)
+            self.assertEqual(retry["error"].response.status_code, 429)
+
+    def test_retries_exhausted(self):
+        dnacp = self.api(backoff_factor = 0.001, max_retries = 2, coalesce = False)
+        dnacp.get_token()
+        self.fake("throttle", {"requests": 3})
+        with self.assertRaises(exceptions.ClientError) as raised:
+            dnacp.get("/api/v1/network-device/dev-00000001")
+        self.assertEqual(raised.exception.response.status_code, 429)
+        self.assertEqual(self.stats()["device_by_id"], 3)
+
+
+class CountingCodec(StdlibCodec):
+    """Records the responses encoded, leaving out request bodies (None)
+    """
+
+    def __init__(self):
+        self.encoded = []
+
+    def dumps(self, obj):
+        if obj is not None:
+            self.encoded.append(obj)
+        return StdlibCodec.dumps(self, obj)
+
+
+class SharedGetTest(ControllerTestCase):
+
+    URL = "/api/v1/network-device/dev-00000001"
+
+    def test_alone(self):
+        codec = CountingCodec()
+        dnacp = self.api(json_codec = codec)
+        dnacp.get(self.URL)
+        self.assertEqual(codec.encoded, [])
+
+    def test_joined(self):
+        codec = CountingCodec()
+        dnacp = self.api(json_codec = codec)
+        dnacp.get_token()
+        self.server.latency = 0.3
+        results = [None, None]
+
+        def get(index):
+            results[index] = dnacp.get(self.URL)
+        threads = [threading.Thread(target = get, args = (index, )) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.stats()["device_by_id"], 1)
+        self.assertEqual(results[0], results[1])
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual(len(codec.encoded), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import socket
+import unittest
+
+from controller import ControllerTestCase
+from dnacsdk.api import Api
+from dnacsdk.deploymentTracker import DeploymentTracker
+
+TRACKER_OPTIONS = {"initial_delay": 0.01, "max_delay": 0.01, "max_unknown": 3}
+
+
+def unused_address():
+    """Address of a local port nothing listens on
+    """
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    address = "127.0.0.1:{}".format(listener.getsockname()[1])
+    listener.close()
+    return address
+
+
+class DeploymentTrackerTest(ControllerTestCase):
+
+    def deploy(self, dnacp):
+        return dnacp.post("/api/v1/template-programmer/template/deploy",
+                          {"templateId": "tpl-0000", "targetInfo": [{"id": "dev-00000001"}]})["deploymentId"]
+
+    def test_success(self):
+        dnacp = self.api()
+        deploymentId = self.deploy(dnacp)
+        tracker = DeploymentTracker(dnacp, **TRACKER_OPTIONS)
+        tracker.track([deploymentId])
+        self.assertEqual(tracker.wait(timeout = 10), {deploymentId: "SUCCESS"})
+
+    def test_unknown_deployment(self):
+        tracker = DeploymentTracker(self.api(), **TRACKER_OPTIONS)
+        tracker.track(["deploy-missing"])
+        self.assertEqual(tracker.wait(timeout = 10), {"deploy-missing": "ERROR"})
+        self.assertEqual(self.stats()["deploy_status"], 1)
+
+    def test_failed_polls(self):
+        dnacp = self.api(max_retries = 0)
+        deploymentId = self.deploy(dnacp)
+        self.fake("throttle", {"requests": 100})
+        tracker = DeploymentTracker(dnacp, **TRACKER_OPTIONS)
+        tracker.track([deploymentId])
+        self.assertEqual(tracker.wait(timeout = 10), {deploymentId: "ERROR"})
+        self.assertEqual(self.stats()["deploy_status"], 3)
+
+    def test_unreachable_controller(self):
+        dnacp = Api(ip = unused_address(), scheme = "http", username = "admin", password = "admin", max_retries = 0)
+        tracker = DeploymentTracker(dnacp, **TRACKER_OPTIONS)
+        tracker.track(["deploy-1"])
+        self.assertEqual(tracker.wait(timeout = 10), {"deploy-1": "ERROR"})
+        self.assertIn("error", tracker.responses["deploy-1"])
+
+
+class WaitForDeploymentsTest(ControllerTestCase):
+
+    def setUp(self):
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            self.skipTest("aiohttp is not installed")
+        ControllerTestCase.setUp(self)
+
+    def wait(self, deploymentIds, ip = None):
+        from dnacsdk.asyncApi import AsyncApi, wait_for_deployments
+
+        async def follow():
+            async with AsyncApi(ip = ip or self.ip, scheme = "http", username = "admin",
+                                password = "admin") as dnacp:
+                return await wait_for_deployments(dnacp, deploymentIds, timeout = 10, **TRACKER_OPTIONS)
+        return asyncio.get_event_loop().run_until_complete(follow())
+
+    def test_unknown_deployment(self):
+        self.assertEqual(self.wait(["deploy-missing"]), {"deploy-missing": "ERROR"})
+
+    def test_unreachable_controller(self):
+        self.assertEqual(self.wait(["deploy-1"], ip = unused_address()), {"deploy-1": "ERROR"})
+
+
+if __name__ == "__main__":
+    unittest.main()
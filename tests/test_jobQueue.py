@@ -0,0 +1,99 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from controller import ControllerTestCase, ROOT
+from dnacsdk.jobQueue import JobQueue, DeployScheduler, SUBMITTED, SUCCEEDED
+
+ONBOARDING = "NetworkDeviceOnboarding"
+
+# Runs a scheduler in a child process, printing every job change
+SCHEDULER = """
+import sys
+sys.path.insert(0, {root!r})
+from dnacsdk.api import Api
+from dnacsdk.jobQueue import JobQueue, DeployScheduler
+
+dnacp = Api(ip = {ip!r}, scheme = "http", username = "admin", password = "admin")
+scheduler = DeployScheduler(JobQueue(sys.argv[1]), dnacp, max_in_flight = 2,
+                            initial_delay = 0.05, max_delay = 0.05)
+for job in scheduler.run():
+    print(job.id, job.state, job.deployment_id)
+    sys.stdout.flush()
+"""
+
+
+class ResumeTest(ControllerTestCase):
+
+    devices = 6
+
+    def setUp(self):
+        ControllerTestCase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.sqlite")
+        queue = JobQueue(self.path)
+        queue.add_many((ONBOARDING, device["hostname"],
+                        {"INTERFACE": "Gi1/0/1", "VLAN": "1001", "INTERFACE_DESCRIPTION": "Camera"})
+                       for device in self.server.fixtures.devices)
+        queue.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        ControllerTestCase.tearDown(self)
+
+    def resume(self):
+        queue = JobQueue(self.path)
+        self.addCleanup(queue.close)
+        scheduler = DeployScheduler(queue, self.api(), max_in_flight = 2,
+                                    initial_delay = 0.05, max_delay = 0.05)
+        list(scheduler.run(timeout = 30))
+        return queue
+
+    def test_resume_after_kill(self):
+        # Deployments stay in progress until the first run is killed
+        self.server.status_polls = 10 ** 6
+        child = subprocess.Popen([sys.executable, "-c", SCHEDULER.format(root = ROOT, ip = self.ip), self.path],
+                                 stdout = subprocess.PIPE, universal_newlines = True)
+        try:
+            submitted = {}
+            while len(submitted) < 2:
+                line = child.stdout.readline()
+                self.assertTrue(line, "scheduler exited early")
+                job_id, state, deploymentId = line.split()
+                if state == SUBMITTED:
+                    submitted[int(job_id)] = deploymentId
+        finally:
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+            child.stdout.close()
+        self.assertEqual(len(self.server.deployments), 1)
+
+        self.server.status_polls = 0
+        queue = self.resume()
+        jobs = queue.jobs()
+        self.assertEqual([job.state for job in jobs], [SUCCEEDED] * self.devices)
+        # The deployment of the killed run is followed, not sent again
+        for job in jobs:
+            if job.id in submitted:
+                self.assertEqual(job.deployment_id, submitted[job.id])
+        self.assertEqual(self.server.stats["deploy"], len(self.server.deployments))
+        self.assertEqual(len(self.server.deployments), len(set(job.deployment_id for job in jobs)))
+
+    def test_resume_interrupted_submission(self):
+        # Killed while the deploy request was in flight
+        queue = JobQueue(self.path)
+        queue.claim([queue.jobs()[0].id])
+        queue.close()
+
+        queue = self.resume()
+        self.assertEqual([job.state for job in queue.jobs()], [SUCCEEDED] * self.devices)
+        self.assertEqual(sum(len(deployment["targets"]) for deployment in self.server.deployments.values()),
+                         self.devices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import unittest
+
+import controller  # noqa: F401, puts the repository on sys.path
+from dnacsdk.jsonCodec import iter_json_items
+
+
+def split(payload, size):
+    """payload in chunks of size bytes, with empty chunks in between
+    """
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+        yield b""
+
+
+class IterJsonItemsTest(unittest.TestCase):
+
+    PAYLOAD = json.dumps({
+        "version": "1.0",
+        "meta": {"response": ["not", "this"], "note": "a \"quoted\" ]}, {"},
+        "response": [
+            {"hostname": "sw1", "description": "Caf\u00e9 \u2603 \U0001F600", "count": 1234567890},
+            {"path": "C:\\\\temp\\", "escaped": "\\u00e9 \\\" \\n", "nested": [[], {}, [1, [2.5e-3]]]},
+            "tail \\",
+            -0.125,
+            None,
+        ],
+        "total": 5,
+    }, ensure_ascii = False).encode("utf-8")
+
+    def expected(self):
+        return json.loads(self.PAYLOAD.decode("utf-8"))["response"]
+
+    def test_every_chunk_size(self):
+        for size in range(1, len(self.PAYLOAD) + 1):
+            self.assertEqual(list(iter_json_items(split(self.PAYLOAD, size))), self.expected(), size)
+
+    def test_every_split_point(self):
+        # Cuts inside strings, escapes, multibyte characters and numbers
+        for position in range(len(self.PAYLOAD) + 1):
+            chunks = [self.PAYLOAD[:position], self.PAYLOAD[position:]]
+            self.assertEqual(list(iter_json_items(chunks)), self.expected(), position)
+
+    def test_empty(self):
+        for payload in (b'{"response": [], "version": "1.0"}', b"{}", b' { "version" : "1.0" } ',
+                        b'{"response":[ ]}'):
+            for size in (1, 2, len(payload)):
+                self.assertEqual(list(iter_json_items(split(payload, size))), [], payload)
+
+    def test_single_value(self):
+        self.assertEqual(list(iter_json_items(split(b'{"response": {"id": "dev-1"}}', 3))), [{"id": "dev-1"}])
+        self.assertEqual(list(iter_json_items(split(b'{"response": 42}', 1))), [42])
+
+    def test_truncated(self):
+        for payload in (b"", b'{"response": [1, 2', b'{"response": [{"a": "b}]}', b"[]"):
+            with self.assertRaises(ValueError):
+                list(iter_json_items(split(payload, 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
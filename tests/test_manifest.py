@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import controller  # noqa: F401, puts the repository on sys.path
+from dnacsdk.manifest import read_manifest
+
+YAML = """# floor 3
+- target: sw00001.lab.local
+  params:
+    INTERFACE: Gi1/0/1
+
+- target: sw00002.lab.local
+  INTERFACE: Gi1/0/2
+"""
+
+
+class ReadManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as manifest:
+            manifest.write(text)
+        return path
+
+    def test_yaml_lines(self):
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML is not installed")
+        rows = read_manifest(self.write("floor3.yaml", YAML), default_template = "NetworkDeviceOnboarding")
+        self.assertEqual([(row.line, row.target, row.params) for row in rows],
+                         [(2, "sw00001.lab.local", {"INTERFACE": "Gi1/0/1"}),
+                          (6, "sw00002.lab.local", {"INTERFACE": "Gi1/0/2"})])
+        with self.assertRaisesRegex(ValueError, "^Line 8: "):
+            read_manifest(self.write("bad.yaml", YAML + "- just a string\n"))
+        with self.assertRaisesRegex(ValueError, "list of objects"):
+            read_manifest(self.write("dict.yaml", "target: sw00001.lab.local\n"))
+        self.assertEqual(read_manifest(self.write("empty.yaml", "# nothing yet\n")), [])
+
+    def test_csv_lines(self):
+        rows = read_manifest(self.write("floor3.csv", "target,VLAN\nsw00001.lab.local,1001\nsw00002.lab.local,\n"))
+        self.assertEqual([(row.line, row.target, row.template, row.params) for row in rows],
+                         [(2, "sw00001.lab.local", None, {"VLAN": "1001"}),
+                          (3, "sw00002.lab.local", None, {"VLAN": ""})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from controller import ControllerTestCase
+from dnacsdk.networkDevice import NetworkDevice
+
+
+class IterRecordsTest(ControllerTestCase):
+
+    def hostnames(self, page_size, **options):
+        return [record["hostname"] for record in
+                NetworkDevice.iter_records(self.api(**options), page_size = page_size)]
+
+    def test_pages(self):
+        expected = [device["hostname"] for device in self.server.fixtures.devices]
+        for page_size in (1, 3, 5, 10, 11, 500):
+            self.fake("reset")
+            self.assertEqual(self.hostnames(page_size, stream_chunk_size = 7), expected, page_size)
+            # An exact multiple of the page size costs one more, empty, page
+            self.assertEqual(self.stats()["device_list"], len(expected) // page_size + 1, page_size)
+
+    def test_no_devices(self):
+        self.server.fixtures.devices = []
+        self.assertEqual(self.hostnames(5), [])
+        self.assertEqual(self.stats()["device_list"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()